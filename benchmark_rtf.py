@@ -0,0 +1,292 @@
+'''
+* PROGRAM NAME: RTF TO JSON CONVERTOR BENCHMARK
+* VERSION AND DATE: 1.0 17-10-2026
+
+* LANGUAGE AND LIBRARY REFERENCE: Python3,
+Python Standard Libraries:
+  - argparse
+  - json
+  - os
+  - random
+  - subprocess
+  - sys
+  - tempfile
+  - time
+
+* PURPOSE: Measures the throughput of the RTF to JSON convertor.
+Generates synthetic RTF files in the layout of SAS ODS RTF listings, which adheres
+to the schema checked by 'check_rtf', then times 'convert_rtf' and each extraction stage.
+* PARAMETERS: Number of pages, rows per page, columns and footnote length.
+* RETURNS: A table of seconds, pages/sec and MB/sec per stage.
+* FUNCTION CALL NAME(s): generate_rtf, run_benchmark, test_output_modes
+* MODULE: benchmark_rtf.py
+**************************************************************************
+'''
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import code_analysis3 as converter
+
+# Content of the RTF file before the first page
+RTF_PRELUDE = (
+    "{\\rtf1\\ansi\\ansicpg1252\\uc1\\deff0\\deflang1033\\deflangfe1033\n"
+    "{\\fonttbl\n"
+    "{\\f1\\froman\\fprq2{\\*\\panose 02020603050405020304}\\fcharset0 Times New Roman;}\n"
+    "{\\f2\\fswiss\\fprq2\\fcharset0 Arial;}\n"
+    "{\\f3\\fmodern\\fprq1\\fcharset0 Courier New;}\n"
+    "}\n"
+    "{\\colortbl;\\red0\\green0\\blue0;\\red255\\green255\\blue255;}\n"
+    "{\\stylesheet{\\widctlpar\\adjustright\\fs20\\cgrid\\snext0 Normal;}"
+    "{\\s1\\ql\\f1\\fs18 Table Text;}}\n"
+    "{\\info{\\title SAS Output}}\n"
+    "\\widowctrl\\ftnbj\\aenddoc\\formshade\\viewkind1\\viewscale100\n"
+)
+
+# Page header with the PAGE and NUMPAGES fields
+RTF_HEADER = (
+    "{\\header\\pard\\plain\\qc{\n"
+    "\\trowd\\trkeep\\trqc\\trgaph0\n\\cellx6480\n\\cellx12960\n"
+    "\\pard\\plain\\intbl\\sb0\\sa0\\ql\\f1\\fs18\\cf1{Protocol: BENCH-001\\cell}\n"
+    "\\pard\\plain\\intbl\\sb0\\sa0\\qr\\f1\\fs18\\cf1{Page {\\field{\\*\\fldinst { PAGE }}}"
+    "{ of }{\\field{\\*\\fldinst { NUMPAGES }}}\\cell}\n"
+    "{\\row}\n}}\n"
+)
+
+# Function to generate the content of a synthetic RTF file
+
+def generate_rtf(pages, rows, columns, footnote_words, seed=0):
+    '''
+    This function generates the content of an RTF file in the layout of a SAS listing
+    Every page has a header, two title rows, a column header row,
+    'rows' subject rows of 'columns' cells and a footnote row of 'footnote_words' words
+    The cell values mix integers, decimals, counts with percentages and text
+    The same seed always gives the same content
+    '''
+    generator = random.Random(seed)
+    cell_widths = "".join(f"\\cellx{1440 * (c + 1)}\n" for c in range(columns))
+    parts = [RTF_PRELUDE]
+    for page in range(pages):
+        parts.append("\\sectd\\linex0\\endnhere\\pgwsxn15840\\pghsxn12240\\lndscpsxn\n")
+        parts.append(RTF_HEADER)
+        for title in (f"Listing 16.2.{page % 9 + 1}", "Subject Data {\\line}\nSafety Population"):
+            parts.append("\\trowd\\trkeep\\trhdr\\trqc\\trgaph0\n\\cellx12960\n"
+                         "\\pard\\plain\\intbl\\keepn\\sb0\\sa0\\qc\\f1\\fs18\\cf1"
+                         f"{{{title}\\cell}}\n{{\\row}}\n")
+        parts.append("\\trowd\\trkeep\\trhdr\\trqc\\trgaph0\n" + cell_widths)
+        for c in range(columns):
+            parts.append("\\pard\\plain\\intbl\\keepn\\sb0\\sa0\\qc\\f1\\fs18\\cf1"
+                         f"{{\\b Variable\\~{c + 1}\\cell}}\n")
+        parts.append("{\\row}\n")
+        for row in range(rows):
+            parts.append("\\trowd\\trkeep\\trqc\\trgaph0\n" + cell_widths)
+            for c in range(columns):
+                value = generator.choice((
+                    str(generator.randrange(1000, 9999)),
+                    f"{generator.randrange(100)} ({generator.uniform(0, 100):.1f}%)",
+                    f"{generator.uniform(-50, 50):.2f}",
+                    f"Subject {page * rows + row + 1}-{c}"))
+                parts.append("\\pard\\plain\\intbl\\sb0\\sa0\\ql\\f1\\fs18\\cf1"
+                             f"{{{value}\\cell}}\n")
+            parts.append("{\\row}\n")
+        footnote = " ".join(f"note{generator.randrange(500)}" for _ in range(footnote_words))
+        parts.append("\\trowd\\trkeep\\trqc\\trgaph0\n\\cellx12960\n"
+                     "\\pard\\plain\\intbl\\keepn\\sb0\\sa0\\ql\\f1\\fs16\\cf1"
+                     f"{{Note: {footnote} Source: ADSL\\cell}}\n{{\\row}}\n")
+        parts.append("\\pard\\b0\\i0\\qc\\f1\\fs20\\cf1{\\par}\n")
+        if page < pages - 1:
+            parts.append("\\sect")
+    parts.append("}\n")
+    return "".join(parts)
+
+# Function to time the extraction stages of each page
+
+def time_stages(rtf_content):
+    '''
+    This function runs the extraction stages of 'extract_page_content' one by one on each page
+    and returns the total seconds spent in each stage
+    '''
+    timings = dict.fromkeys(("extract_font_details", "extract_page_breaks", "tokenize_rtf",
+                             "extract_header", "extract_title", "extract_column_headers",
+                             "extract_table_data", "extract_footnotes", "extract_footer"), 0.0)
+    start = time.perf_counter()
+    converter.extract_font_details(rtf_content)
+    timings["extract_font_details"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    page_breaks = converter.extract_page_breaks(rtf_content)
+    timings["extract_page_breaks"] += time.perf_counter() - start
+
+    converter.PAGE = 0
+    for i in range(len(page_breaks) - 1):
+        page_content = rtf_content[page_breaks[i]:page_breaks[i + 1]]
+        start = time.perf_counter()
+        tokens = converter.tokenize_rtf(page_content)
+        lap = time.perf_counter()
+        timings["tokenize_rtf"] += lap - start
+        _, position = converter.extract_header(page_content, tokens)
+        start, lap = lap, time.perf_counter()
+        timings["extract_header"] += lap - start
+        _, position = converter.extract_title(page_content, tokens, position)
+        start, lap = lap, time.perf_counter()
+        timings["extract_title"] += lap - start
+        column_headers, position = converter.extract_column_headers(page_content, tokens,
+                                                                    position)
+        start, lap = lap, time.perf_counter()
+        timings["extract_column_headers"] += lap - start
+        _, position = converter.extract_table_data(page_content, column_headers, tokens,
+                                                   position)
+        start, lap = lap, time.perf_counter()
+        timings["extract_table_data"] += lap - start
+        footnotes = converter.extract_footnotes(page_content, position)
+        start, lap = lap, time.perf_counter()
+        timings["extract_footnotes"] += lap - start
+        converter.extract_footer(footnotes)
+        timings["extract_footer"] += time.perf_counter() - lap
+    return timings
+
+# Function to run the benchmark
+
+def run_benchmark(pages, rows, columns, footnote_words, repeat=3, stream=False):
+    '''
+    This function generates an RTF file, converts it 'repeat' times and times each stage
+    The best time of the repeats is kept for every stage
+    It returns a list of (stage, seconds, pages/sec, MB/sec) results
+    '''
+    rtf_text = generate_rtf(pages, rows, columns, footnote_words)
+    size_mb = len(rtf_text.encode("utf-8")) / (1024 * 1024)
+    best = {}
+    with tempfile.TemporaryDirectory() as work_directory:
+        rtf_file = os.path.join(work_directory, "benchmark.rtf")
+        with open(rtf_file, 'w', encoding = "utf-8") as f:
+            f.write(rtf_text)
+        rtf_content = converter.clean_rtf_content(rtf_text.encode("utf-8"))
+        for _ in range(repeat):
+            start = time.perf_counter()
+            status, remarks = converter.convert_rtf(rtf_file, 1, work_directory, stream=stream)
+            timings = {"convert_rtf": time.perf_counter() - start}
+            if status != "Successful":
+                raise RuntimeError(f"Benchmark file could not be converted: {remarks}")
+            timings.update(time_stages(rtf_content))
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+    return [(stage, seconds, pages / seconds if seconds else float("inf"),
+             size_mb / seconds if seconds else float("inf"))
+            for stage, seconds in best.items()]
+
+# Function to read the pages of a JSON output file
+
+def read_output_pages(output_file):
+    '''
+    This function reads a JSON output file of either layout and returns the fonts
+    and the list of page details, in the order of the pages
+    The pages of the 'tables' layout are rebuilt from the rows of each table
+    '''
+    with open(output_file, encoding = "utf-8") as f:
+        output = json.load(f)
+    if 'data' in output:
+        return output['fonts'], output['data']
+    pages = []
+    for table in output['tables']:
+        for table_page in table['pages']:
+            page = {'header': table_page['header']}
+            for key, value in table.items():
+                if key == 'subjects':
+                    first_row = table_page['first row']
+                    page[key] = value[first_row : first_row + table_page['rows']]
+                elif key != 'pages':
+                    page[key] = value
+            pages.append((table_page['page'], page))
+    assert [page_no for page_no, _ in pages] == list(range(1, len(pages) + 1))
+    return output['fonts'], [page for _, page in pages]
+
+#test function to check that the output is the same in every mode
+
+"""
+This test function is to check that a generated RTF file is converted to the same pages
+whatever the output format, layout, row storage, reading and page extraction are
+The config file is made by config1.py in the temporary folder of the test
+"""
+def test_output_modes():
+    modes = {
+        "compact": ({'OUTPUT': {'format': 'compact'}}, False),
+        "compact rows": ({'PROCESSING': {'compact rows': 'yes'}}, False),
+        "stream": ({}, True),
+        "page workers": ({'PROCESSING': {'page workers': '2', 'page batch': '7'}}, False),
+        "tables": ({'OUTPUT': {'layout': 'tables'}}, False),
+    }
+    defaults = {'OUTPUT': {'format': 'pretty', 'layout': 'pages', 'tables': 'none',
+                           'sink': 'json', 'column types': 'no'},
+                'PROCESSING': {'compact rows': 'no', 'page workers': '1'}}
+    with tempfile.TemporaryDirectory() as work_directory:
+        subprocess.run([sys.executable,
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), "config1.py")],
+                       cwd=work_directory, check=True)
+        config_path = os.path.join(work_directory, "config.ini")
+        rtf_file = os.path.join(work_directory, "modes.rtf")
+        with open(rtf_file, 'w', encoding = "utf-8") as f:
+            f.write(generate_rtf(30, 6, 5, 8))
+
+        outputs = {}
+        for mode, (overrides, stream) in [("pretty", ({}, False))] + list(modes.items()):
+            config = {section: {**options, **overrides.get(section, {})}
+                      for section, options in defaults.items()}
+            converter.load_config(config_path, config)
+            output_directory = os.path.join(work_directory, mode)
+            status, remarks = converter.convert_rtf(rtf_file, 1, output_directory, stream=stream)
+            assert status == "Successful", f"{mode}: {remarks}"
+            outputs[mode] = read_output_pages(
+                converter.get_output_file("modes.rtf", output_directory))
+
+        fonts, pages = outputs.pop("pretty")
+        assert len(pages) == 30 and all(len(page['subjects']) == 6 for page in pages)
+        for mode, (mode_fonts, mode_pages) in outputs.items():
+            assert mode_fonts == fonts, f"{mode}: fonts differ from the pretty output"
+            assert len(mode_pages) == len(pages), f"{mode}: number of pages differs"
+            for page_no, (mode_page, page) in enumerate(zip(mode_pages, pages), 1):
+                assert mode_page == page, f"{mode}: page {page_no} differs from the pretty output"
+
+def main(argv=None):
+    '''
+    This function is the command line entry point of the benchmark
+    It prints the results as a table, or as JSON with '--json'
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the RTF to JSON convertor")
+    parser.add_argument("--pages", type=int, default=200, help="number of pages")
+    parser.add_argument("--rows", type=int, default=40, help="subject rows per page")
+    parser.add_argument("--columns", type=int, default=8, help="columns per row")
+    parser.add_argument("--footnote-words", type=int, default=30,
+                        help="number of words in each footnote")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs, the best time is reported")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the file through a memory map, one page at a time")
+    parser.add_argument("-c", "--config", default="config.ini",
+                        help="path of the config file (default: config.ini)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    # The JSON output of the benchmark file is always written the same way
+    converter.load_config(args.config, {'OUTPUT': {'format': 'pretty', 'layout': 'pages',
+                                                      'tables': 'none'}})
+    results = run_benchmark(args.pages, args.rows, args.columns, args.footnote_words,
+                            args.repeat, args.stream)
+    if args.json:
+        print(json.dumps([{"stage": stage, "seconds": seconds, "pages/sec": pages_per_second,
+                           "MB/sec": mb_per_second}
+                          for stage, seconds, pages_per_second, mb_per_second in results],
+                         indent=4))
+    else:
+        print(f"{'Stage':<24}{'Seconds':>10}{'Pages/sec':>14}{'MB/sec':>10}")
+        for stage, seconds, pages_per_second, mb_per_second in results:
+            print(f"{stage:<24}{seconds:>10.4f}{pages_per_second:>14.1f}{mb_per_second:>10.2f}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
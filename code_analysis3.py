@@ -11,6 +11,23 @@ Python Standard Libraries:
   - tkinter
   - configparser
   - datetime
+  - mmap
+  - concurrent.futures
+  - argparse
+  - hashlib
+  - csv
+  - sqlite3
+  - time
+  - logging
+  - multiprocessing
+  - itertools
+  - ctypes
+  - select
+  - signal
+  - struct
+  - asyncio
+  - http
+  - urllib
 
 * PURPOSE: Processes RTF files to extract basic data and convert it to JSON format. 
 Includes dynamic extraction using control words and robust error handling.
@@ -37,33 +54,187 @@ Includes dynamic extraction using control words and robust error handling.
 * CHANGE REASON: Updates and improvements
 '''
 
+import argparse
+import atexit
+import csv
+import ctypes
+import hashlib
+import io
 import json
+import logging
+import mmap
+import multiprocessing
 import re
 import os
-import tkinter as tk
-from tkinter import filedialog, ttk, messagebox
+import select
+import signal
+import sqlite3
+import struct
+import sys
+import time
+from collections import deque, namedtuple
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from configparser import ConfigParser
 from datetime import datetime
-
-
-#Read config.ini file
-config_object = ConfigParser()
-config_object.read("config.ini")
-
-# Get the RTF tags, RE expressions and alignment data from the config file
-RTF_tags = config_object["RTF TAGS"]
-RE_expressions = config_object["RE EXPRESSIONS"]
-Header_alignment = config_object['HEADER ALIGNMENT']
-
-log_file_exceptions = open(
-    "/Users/adithi/Desktop/Log File Exceptions.txt",
-    'a', encoding = "utf-8")
-log_file_success = open(
-    "/Users/adithi/Desktop/Log File Success.txt", 
-    'a', encoding = "utf-8")
-
-log_file_exceptions.write('\n' + str(datetime.now()) + '\n')
-log_file_success.write('\n' + str(datetime.now()) + '\n')
+from itertools import islice
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+
+
+# The config.ini file is read by 'load_config' when the converter is started
+CONFIG_PATH = "config.ini"
+config_object = None
+RTF_tags = None
+RE_expressions = None
+Header_alignment = None
+
+# Number of worker processes used to convert the files of a folder
+WORKERS = 1
+# Files of at least this size are read one page at a time, 0 reads every file at once
+STREAM_SIZE = 0
+# Unchanged files are skipped using the manifest in the output directory
+CACHE = False
+# Fingerprint of the config options that change the JSON output
+CONFIG_FINGERPRINT = ""
+MANIFEST_FILE = ".rtf_to_json_manifest.json"
+# Time, calls and characters of each stage are recorded when the metrics are switched on
+METRICS = False
+STAGE_METRICS = {}
+# Stages that run while the output file is written
+PAGE_STAGES = ('read_rtf_pages', 'extract_page_content', 'extract_page_batches')
+# Number of worker processes used to extract the pages of a single file,
+# and the number of pages sent to a worker at once
+PAGE_WORKERS = 1
+PAGE_BATCH = 50
+# Seconds between checks of a watched folder, seconds a file must be unchanged
+# before it is converted, and the file of status records in the output directory
+POLL_INTERVAL = 1.0
+SETTLE_TIME = 2.0
+STATUS_FILE = "status.ndjson"
+# inotify events of a watched folder: IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO and IN_CREATE
+INOTIFY_EVENTS = 0x002 | 0x008 | 0x080 | 0x100
+# Address of the conversion service, its worker processes, the number of requests
+# that may wait for a worker, the seconds a request may take and its largest size
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 1
+SERVICE_QUEUE_LIMIT = 8
+SERVICE_TIMEOUT = 300.0
+SERVICE_MAX_SIZE = 256 * 1024 * 1024
+# Format of the output files: 'pretty', 'compact' or 'ndjson'
+OUTPUT_FORMAT = "pretty"
+# Layout of the output files: 'pages' writes every page, 'tables' merges the consecutive
+# pages of the same table into one table object
+OUTPUT_LAYOUT = "pages"
+# Encoders of the subject rows when the rows of a page are written as they are read,
+# and the number of rows encoded at once
+PRETTY_ENCODER = json.JSONEncoder(indent=4)
+COMPACT_ENCODER = json.JSONEncoder(separators=(',', ':'))
+ROW_BATCH = 100
+# Format of the subject table files written next to the output files:
+# 'none', 'columnar', 'csv' or 'sqlite'
+TABLE_FORMAT = "none"
+# Where the output is written: 'json' writes one file per RTF file, 'sqlite' writes
+# every RTF file to one SQLite database, named 'database', in the output directory
+OUTPUT_SINK = "json"
+DATABASE_FILE = "output.sqlite"
+# Seconds a worker waits for another worker to finish writing to the database
+DATABASE_TIMEOUT = 300.0
+# Number of subject cells inserted into the database at once
+DATABASE_BATCH = 50000
+# Tables of the SQLite database, keyed by document and page so the rows of a document
+# are found, and replaced, through the primary keys
+DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, pages INTEGER, fonts TEXT);
+CREATE TABLE IF NOT EXISTS pages (
+    document INTEGER NOT NULL, page INTEGER NOT NULL, header TEXT, column_headers TEXT,
+    column_types TEXT, footer TEXT, PRIMARY KEY (document, page)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS titles (
+    document INTEGER NOT NULL, page INTEGER NOT NULL, line INTEGER NOT NULL, title TEXT,
+    PRIMARY KEY (document, page, line)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS footnotes (
+    document INTEGER NOT NULL, page INTEGER NOT NULL, footnote TEXT,
+    PRIMARY KEY (document, page)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS subjects (
+    document INTEGER NOT NULL, page INTEGER NOT NULL, row_no INTEGER NOT NULL,
+    column_name TEXT NOT NULL, value,
+    PRIMARY KEY (document, page, row_no, column_name)) WITHOUT ROWID;
+"""
+# Indexes of the SQLite database, which are not made in the file the rows are staged in
+DATABASE_INDEXES = """
+CREATE INDEX IF NOT EXISTS titles_title ON titles (title);
+CREATE INDEX IF NOT EXISTS footnotes_footnote ON footnotes (footnote);
+CREATE INDEX IF NOT EXISTS subjects_column ON subjects (column_name, value);
+"""
+# The words of the titles, headers and footnotes of each page are kept in an inverted index
+# in the output directory, when 'index' is switched on
+INDEX = False
+INDEX_FILE = "index.sqlite"
+INDEX_TOKEN_PATTERN = re.compile(r"\w+")
+# Field of the index that each page detail is added to
+INDEX_FIELDS = {'header': 'header', 'title': 'title', 'footnotes': 'footnotes',
+                'footer': 'footnotes'}
+# Tables of the index, with one posting per word, file, page and field,
+# so the pages with a word are found through the primary key
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL, file INTEGER NOT NULL, page INTEGER NOT NULL, field TEXT NOT NULL,
+    PRIMARY KEY (token, file, page, field)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file);
+"""
+# Config options given for this run only, e.g. on the command line
+CONFIG_OVERRIDES = {}
+
+# Converter used by the module-level functions, made by 'load_config'
+CONVERTER = None
+# Compiled re expressions used by the extractors
+CELL_PATTERN = re.compile(r'{(.+)\\cell}')
+CONTROL_WORD_PATTERN = re.compile(r"\\\w+")
+
+# Structural control words and groups emitted by the RTF lexer
+RTF_TOKENS = {
+    'trhdr': '\\trhdr',
+    'trowd': '\\trowd',
+    'keepn': '\\keepn',
+    'header': '{\\header',
+    'row': '{\\row}'
+}
+RtfToken = namedtuple('RtfToken', ['word', 'start', 'end'])
+# Number of distinct page heads cached for each document
+TEMPLATE_CACHE_SIZE = 32
+
+# Types of the table columns, tried in this order on every value of a column
+# The values of a 'count (percent)' or 'mean (sd)' column are stored as a pair,
+# such as {"count": 12, "percent": 34.5} for '12 (34.5%)'
+DECIMAL = r"-?(?:\d+\.?\d*|\.\d+)"
+COLUMN_TYPES = {
+    'integer': r"-?\d+",
+    'number': DECIMAL,
+    'count (percent)': rf"(-?\d+)\s*\(\s*({DECIMAL})\s*%\s*\)",
+    'mean (sd)': rf"({DECIMAL})\s*\(\s*({DECIMAL})\s*\)",
+}
+# Each pattern matches all the values of a column joined by line breaks at once
+COLUMN_TYPE_PATTERNS = {column_type: (re.compile(f"(?:{pattern})(?:\n(?:{pattern}))*"),
+                                      re.compile(f"^{pattern}$", re.MULTILINE))
+                        for column_type, pattern in COLUMN_TYPES.items()}
+PAGE_BREAK = b"\\endnhere"
+# Control words of the color table and stylesheet entries
+COLOR_PATTERN = re.compile(r"\\red(\d+)\\green(\d+)\\blue(\d+)")
+STYLE_PATTERN = re.compile(r"\\(s|cs|ds|ts)(\d+)(?![a-z])")
+STYLE_WORD_PATTERN = re.compile(r"\\[a-z]+-?\d* ?|\\\*|[{}\n]")
+
+# The log files are opened by 'open_log_files' when the converter is started
+# Log records are put on LOG_QUEUE, by this process and its worker processes,
+# and written to the log files by a background thread of this process
+LOG_QUEUE = None
+log_listener = None
+log_buffers = []
+exception_logger = logging.getLogger("rtf_to_json.exceptions")
+success_logger = logging.getLogger("rtf_to_json.success")
+# Name of the RTF file that is being converted, added to the log records
+CURRENT_FILE = ""
 
 # Global debugging flag
 DEBUG = False
@@ -73,6 +244,10 @@ FOLDER_TO_DELETE = ""
 # global PAGE variable declaration to count the number of pages
 PAGE = 0
 NUMPAGES = 0
+# Page heads of the file being converted, cached by 'RtfConverter.extract_page_head'
+PAGE_TEMPLATES = {}
+# Column headers tuples of the file being converted, shared by 'RtfConverter.table_schema'
+PAGE_SCHEMAS = {}
 # global value declaration
 SELECTED_FOLDER_PATH = ""
 FOLDER_PATH = ""
@@ -81,37 +256,1039 @@ table = ""
 def debug_print(message):
     '''
     This function serves as the debugging switch
+    The messages are printed to stderr, so the results printed to stdout are kept apart
     '''
     if DEBUG:
-        print(message)
+        print(message, file=sys.stderr, flush=True)
+
+# Function to read the config.ini file
+
+def read_config(config_path="config.ini", overrides=None):
+    '''
+    This function reads the config.ini file and returns it
+    The overrides are a dictionary of {section: {option: value}} that replace
+    the options of the config file
+    '''
+    config = ConfigParser()
+    if not config.read(config_path):
+        raise FileNotFoundError(f"Config file {config_path} not found")
+    for section, options in (overrides or {}).items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for option, value in options.items():
+            config.set(section, option, value)
+    return config
+
+def load_config(config_path="config.ini", overrides=None):
+    '''
+    This function reads the config.ini file
+    It sets the RTF tags, RE expressions, alignment data and processing options
+    that are used by the rest of the functions, and the converter they use
+    The overrides are a dictionary of {section: {option: value}} that replace
+    the options of the config file for this run
+    '''
+    global CONFIG_PATH, config_object, RTF_tags, RE_expressions, Header_alignment, CONVERTER
+    global WORKERS, STREAM_SIZE, CACHE, METRICS, CONFIG_FINGERPRINT, PAGE_WORKERS, PAGE_BATCH
+    global OUTPUT_FORMAT, TABLE_FORMAT, CONFIG_OVERRIDES, POLL_INTERVAL, SETTLE_TIME, STATUS_FILE
+    global SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_QUEUE_LIMIT, SERVICE_TIMEOUT
+    global SERVICE_MAX_SIZE, OUTPUT_LAYOUT, OUTPUT_SINK, DATABASE_FILE, INDEX
+    CONFIG_PATH = config_path
+    CONFIG_OVERRIDES = overrides or {}
+    config_object = read_config(config_path, CONFIG_OVERRIDES)
+
+    # Get the RTF tags, RE expressions and alignment data from the config file
+    RTF_tags = config_object["RTF TAGS"]
+    RE_expressions = config_object["RE EXPRESSIONS"]
+    Header_alignment = config_object['HEADER ALIGNMENT']
+
+    WORKERS = config_object.getint('PROCESSING', 'workers', fallback=1)
+    STREAM_SIZE = config_object.getint('PROCESSING', 'stream size mb', fallback=0) * 1024 * 1024
+    CACHE = config_object.getboolean('PROCESSING', 'cache', fallback=False)
+    METRICS = config_object.getboolean('PROCESSING', 'metrics', fallback=False)
+    PAGE_WORKERS = config_object.getint('PROCESSING', 'page workers', fallback=1)
+    PAGE_BATCH = max(1, config_object.getint('PROCESSING', 'page batch', fallback=50))
+    POLL_INTERVAL = config_object.getfloat('WATCH', 'poll interval', fallback=1.0)
+    SETTLE_TIME = config_object.getfloat('WATCH', 'settle seconds', fallback=2.0)
+    STATUS_FILE = config_object.get('WATCH', 'status file', fallback="status.ndjson")
+    SERVICE_HOST = config_object.get('SERVICE', 'host', fallback="127.0.0.1")
+    SERVICE_PORT = config_object.getint('SERVICE', 'port', fallback=8765)
+    SERVICE_WORKERS = max(1, config_object.getint('SERVICE', 'workers', fallback=1))
+    SERVICE_QUEUE_LIMIT = max(0, config_object.getint('SERVICE', 'queue limit', fallback=8))
+    SERVICE_TIMEOUT = config_object.getfloat('SERVICE', 'request timeout', fallback=300.0)
+    SERVICE_MAX_SIZE = (config_object.getint('SERVICE', 'max request mb', fallback=256)
+                        * 1024 * 1024)
+    OUTPUT_FORMAT = config_object.get('OUTPUT', 'format', fallback="pretty")
+    if OUTPUT_FORMAT not in ("pretty", "compact", "ndjson"):
+        raise ValueError(f"Unknown output format {OUTPUT_FORMAT} in {config_path}")
+    OUTPUT_LAYOUT = config_object.get('OUTPUT', 'layout', fallback="pages")
+    if OUTPUT_LAYOUT not in ("pages", "tables"):
+        raise ValueError(f"Unknown output layout {OUTPUT_LAYOUT} in {config_path}")
+    TABLE_FORMAT = config_object.get('OUTPUT', 'tables', fallback="none")
+    if TABLE_FORMAT not in ("none", "columnar", "csv", "sqlite"):
+        raise ValueError(f"Unknown table format {TABLE_FORMAT} in {config_path}")
+    OUTPUT_SINK = config_object.get('OUTPUT', 'sink', fallback="json")
+    if OUTPUT_SINK not in ("json", "sqlite"):
+        raise ValueError(f"Unknown output sink {OUTPUT_SINK} in {config_path}")
+    DATABASE_FILE = config_object.get('OUTPUT', 'database', fallback="output.sqlite")
+    INDEX = config_object.getboolean('OUTPUT', 'index', fallback=False)
+
+    # The processing, log file, watch and service options do not change the output,
+    # so they are left out
+    output_config = ConfigParser()
+    for section in config_object.sections():
+        if section not in ('PROCESSING', 'LOG FILES', 'WATCH', 'SERVICE'):
+            output_config[section] = config_object[section]
+    config_text = io.StringIO()
+    output_config.write(config_text)
+    CONFIG_FINGERPRINT = hashlib.sha256(config_text.getvalue().encode("utf-8")).hexdigest()
+
+    CONVERTER = RtfConverter(config_path, config=config_object)
+
+# Function to open the log files
+
+class LogFormatter(logging.Formatter):
+    '''
+    This class formats the log records with their file, page, stage and duration fields
+    As text, the fields that are set are written before the message
+    As JSON, each record is written as one JSON object per line
+    '''
+    FIELDS = ("file", "page", "stage", "duration")
+
+    def __init__(self, json_lines=False):
+        super().__init__("%(asctime)s %(levelname)s %(fields)s%(message)s")
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = {field: getattr(record, field, None) for field in self.FIELDS}
+        if self.json_lines:
+            fields = {field: value for field, value in fields.items() if value is not None}
+            return json.dumps({"time": self.formatTime(record), "level": record.levelname,
+                               **fields, "message": record.getMessage()})
+        record.fields = "".join(f"{field}={value} " for field, value in fields.items()
+                                if value is not None)
+        return super().format(record)
+
+def open_log_files():
+    '''
+    This function opens the exception and success log files named in the config file
+    The log records are put on a queue and written by a background thread,
+    in batches of 'batch size' records, so logging never waits for the disk
+    The worker processes put their records on the same queue, so only this process
+    writes to the log files and the lines of different processes are never interleaved
+    A log file is rotated when it reaches 'max size mb' MB, keeping 'backup count' old files
+    The records are written as text, or as JSON lines when 'format' is 'json'
+    '''
+    global LOG_QUEUE, log_listener, log_buffers
+    close_log_files()
+    max_bytes = int(config_object.getfloat('LOG FILES', 'max size mb', fallback=0) * 1024 * 1024)
+    backup_count = config_object.getint('LOG FILES', 'backup count', fallback=0)
+    batch_size = config_object.getint('LOG FILES', 'batch size', fallback=100)
+    formatter = LogFormatter(config_object.get('LOG FILES', 'format', fallback="text") == "json")
+    handlers = []
+    log_buffers = []
+    for logger, option, fallback in (
+            (exception_logger, 'exceptions', "Log File Exceptions.txt"),
+            (success_logger, 'success', "Log File Success.txt")):
+        log_file = RotatingFileHandler(config_object.get('LOG FILES', option, fallback=fallback),
+                                       maxBytes=max_bytes, backupCount=backup_count,
+                                       encoding = "utf-8", delay=True)
+        log_file.setFormatter(formatter)
+        # The records are only written when the buffer is full or flushed
+        log_buffer = MemoryHandler(batch_size, flushLevel=logging.CRITICAL + 1, target=log_file)
+        log_buffer.addFilter(logging.Filter(logger.name))
+        handlers.append(log_buffer)
+        log_buffers.append(log_buffer)
+
+    LOG_QUEUE = multiprocessing.Queue()
+    log_listener = QueueListener(LOG_QUEUE, *handlers)
+    log_listener.start()
+    set_log_queue(LOG_QUEUE)
+    atexit.register(close_log_files)
+
+    exception_logger.info("Run started")
+    success_logger.info("Run started")
+
+def set_log_queue(log_queue):
+    '''
+    This function sends the log records of this process to a log queue
+    '''
+    root_logger = logging.getLogger("rtf_to_json")
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(logging.INFO)
+    root_logger.propagate = False
+
+# Functions to write to the log files
+
+def log_exception(message, stage=None, page=None, duration=None, file=None):
+    '''
+    This function writes a message to the exception log file, if it is open
+    The file being converted, or the file given, and the page, stage and duration given,
+    are added to the record
+    '''
+    if LOG_QUEUE is not None:
+        exception_logger.error(message.rstrip("\n"), extra={
+            "file": file or CURRENT_FILE or None, "page": page,
+            "stage": stage, "duration": duration})
+
+def log_success(message, stage=None, page=None, duration=None, file=None):
+    '''
+    This function writes a message to the success log file, if it is open
+    The file being converted, or the file given, and the page, stage and duration given,
+    are added to the record
+    '''
+    if LOG_QUEUE is not None:
+        success_logger.info(message.rstrip("\n"), extra={
+            "file": file or CURRENT_FILE or None, "page": page,
+            "stage": stage, "duration": duration})
+
+def flush_log_files():
+    '''
+    This function writes out the log records that are queued or buffered
+    The background thread is stopped once every record on the queue is handled,
+    and started again after the buffers are written
+    Worker processes have nothing to flush, their records are already on the queue
+    '''
+    if log_listener is None:
+        return
+    log_listener.stop()
+    for log_buffer in log_buffers:
+        log_buffer.flush()
+    log_listener.start()
+
+def close_log_files():
+    '''
+    This function writes out the remaining log records and closes the log files
+    It is called when the program exits
+    '''
+    global LOG_QUEUE, log_listener, log_buffers
+    if log_listener is None:
+        return
+    log_listener.stop()
+    for log_buffer in log_buffers:
+        log_file = log_buffer.target
+        log_buffer.close()
+        log_file.close()
+    LOG_QUEUE.close()
+    LOG_QUEUE = log_listener = None
+    log_buffers = []
+
+# Functions to record the metrics of the conversion stages
+
+def record_stage(stage, start, size=0):
+    '''
+    This function adds the time since 'start', one call and 'size' characters
+    to the metrics of a stage
+    It returns the current time, which is the start of the next stage
+    It is only called when the metrics are switched on
+    '''
+    now = time.perf_counter()
+    totals = STAGE_METRICS.get(stage)
+    if totals is None:
+        totals = STAGE_METRICS[stage] = [0.0, 0, 0]
+    totals[0] += now - start
+    totals[1] += 1
+    totals[2] += size
+    return now
+
+def merge_metrics(metrics):
+    '''This function adds the metrics recorded by a worker process to the metrics
+    of this process
+    '''
+    for stage, values in metrics.items():
+        totals = STAGE_METRICS.get(stage)
+        if totals is None:
+            totals = STAGE_METRICS[stage] = [0.0, 0, 0]
+        totals[0] += values["seconds"]
+        totals[1] += values["calls"]
+        totals[2] += values["bytes"]
+
+def stage_seconds(stage):
+    '''This function returns the time recorded so far for a stage'''
+    return STAGE_METRICS[stage][0] if stage in STAGE_METRICS else 0.0
+
+def collect_metrics():
+    '''
+    This function returns the metrics recorded since the last call
+    as a dictionary of {stage: {"seconds", "calls", "bytes"}}, and starts recording afresh
+    '''
+    global STAGE_METRICS
+    metrics = {stage: {"seconds": seconds, "calls": calls, "bytes": size}
+               for stage, (seconds, calls, size) in STAGE_METRICS.items()}
+    STAGE_METRICS = {}
+    return metrics
+
+def summarize_metrics(metrics):
+    '''This function returns the one line summary of the metrics of a file
+    shown in the results table
+    '''
+    seconds = metrics.get("convert_rtf", {}).get("seconds", 0.0)
+    pages = metrics.get("extract_page_content", {}).get("calls", 0)
+    slowest = max((stage for stage in metrics
+                   if stage not in ("convert_rtf", "extract_page_content")),
+                  key=lambda stage: metrics[stage]["seconds"], default="")
+    summary = f"{seconds:.3f} s, {pages} pages"
+    if seconds:
+        summary += f", {pages / seconds:.0f} pages/s"
+    if slowest:
+        summary += f", slowest: {slowest}"
+    return summary
+
+def write_metrics(output_directory, results, metrics, seconds, workers):
+    '''
+    This function writes the metrics of a run to a JSON file in the output directory
+    The file holds the metrics of each converted file and the totals of the run
+    A new file named after the start time of the run is written for each run
+    '''
+    totals = {}
+    for file_metrics in metrics.values():
+        for stage, values in file_metrics.items():
+            stage_totals = totals.setdefault(stage, {"seconds": 0.0, "calls": 0, "bytes": 0})
+            for key, value in values.items():
+                stage_totals[key] += value
+    started = datetime.now().timestamp() - seconds
+    metrics_file = os.path.join(
+        output_directory,
+        f"metrics-{datetime.fromtimestamp(started).strftime('%Y%m%d-%H%M%S-%f')}.json")
+    with open(metrics_file, 'w', encoding = "utf-8") as f:
+        json.dump({"started": str(datetime.fromtimestamp(started)), "seconds": seconds,
+                   "workers": workers,
+                   "files": {file: {"status": status, "remarks": remarks,
+                                    "stages": metrics.get(file, {})}
+                             for file, status, remarks, _ in results},
+                   "stages": totals},
+                  f, indent=4)
+    return metrics_file
+
+# Function to set up a worker process
+
+def init_worker(config_path, overrides=None, log_queue=None):
+    '''
+    This function sets up a worker process of the process pool
+    Worker processes that are started fresh read the config file
+    Forked worker processes already have it from the parent process
+    The log records of the worker are sent to the log queue of the parent process
+    The pages of a file are not extracted in parallel again inside a worker process
+    '''
+    global LOG_QUEUE, log_listener, log_buffers, PAGE_WORKERS
+    if config_object is None:
+        load_config(config_path, overrides)
+    PAGE_WORKERS = 1
+    # A forked worker does not run the background thread of the parent process
+    log_listener = None
+    log_buffers = []
+    LOG_QUEUE = log_queue
+    if log_queue is not None:
+        set_log_queue(log_queue)
+
+# Counters of the RTF file being converted
+
+class RtfDocument:
+    '''
+    This class holds the counters of an RTF file while it is converted
+    'name' is the file name added to the log records, 'page' is the number of the page
+    being extracted and 'numpages' is the number of pages in the file
+    'templates' caches the page heads read from the file, or is None to read every page head
+    'typed' is False when the pages are stitched into tables, which are typed as a whole
+    by 'stitch_pages', so the 'column types' of each page are left as None
+    'schemas' holds the column headers tuples shared by the tables of the file,
+    or is None to give each table its own tuple
+    '''
+    __slots__ = ('name', 'page', 'numpages', 'templates', 'typed', 'schemas')
+
+    def __init__(self, name="", page=0, numpages=0, templates=None, typed=True, schemas=None):
+        self.name = name
+        self.page = page
+        self.numpages = numpages
+        self.templates = templates
+        self.typed = typed
+        self.schemas = schemas
+
+# Function to find the type of each column of a table
+
+def type_columns(column_count, rows):
+    '''This function finds the type of each column of a table, given as rows of text values
+    All the values of a column are joined and checked by a single re expression for
+    each type of 'COLUMN_TYPES' in turn, and the first type they all match is kept
+    A column of any other values, or of no values, is 'text'
+    The values of each column are then converted together
+    It returns the list of column types and the rows of converted values
+    '''
+    full_rows = all(len(row) == column_count for row in rows)
+    if full_rows:
+        columns = [list(column) for column in zip(*rows)] or [[] for _ in range(column_count)]
+    else:
+        columns = [[] for _ in range(column_count)]
+        for row in rows:
+            for i, value in enumerate(row):
+                columns[i].append(value)
+
+    column_types = []
+    for i, column in enumerate(columns):
+        column_type = 'text'
+        if column:
+            joined = "\n".join(column)
+            for name, (column_pattern, value_pattern) in COLUMN_TYPE_PATTERNS.items():
+                if column_pattern.fullmatch(joined):
+                    column_type = name
+                    break
+        if column_type == 'integer':
+            columns[i] = list(map(int, column))
+        elif column_type == 'number':
+            columns[i] = list(map(float, column))
+        elif column_type == 'count (percent)':
+            columns[i] = [{'count': int(count), 'percent': float(percent)}
+                          for count, percent in value_pattern.findall(joined)]
+        elif column_type == 'mean (sd)':
+            columns[i] = [{'mean': float(mean), 'sd': float(sd)}
+                          for mean, sd in value_pattern.findall(joined)]
+        column_types.append(column_type)
+
+    if full_rows:
+        rows = list(zip(*columns))
+    else:
+        values = [iter(column) for column in columns]
+        rows = [tuple(next(values[i]) for i in range(len(row))) for row in rows]
+    return column_types, rows
+
+# Compact table of the subject rows of a page
+
+class SubjectTable:
+    '''
+    This class holds the subject rows of a table in less memory than a list of dictionaries
+    The column headers are kept once in 'columns', a tuple shared by the tables with
+    the same column headers, and each row is a tuple of its values in 'rows'
+    A row with fewer values than columns has no value for the last columns
+    Reading a row gives its dictionary, so the table can be used as a list of rows,
+    and it is written to the JSON output as that list
+    '''
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns, rows=None):
+        self.columns = columns
+        self.rows = [] if rows is None else rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        columns = self.columns
+        return (dict(zip(columns, row)) for row in self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SubjectTable(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __eq__(self, other):
+        if isinstance(other, SubjectTable):
+            return self.to_list() == other.to_list()
+        return self.to_list() == other
+
+    def __repr__(self):
+        return f"SubjectTable(columns={self.columns!r}, rows={len(self.rows)})"
+
+    def to_list(self):
+        '''This function returns the rows as a list of dictionaries'''
+        return list(self)
+
+def json_default(value):
+    '''This function lets json.dumps write a 'SubjectTable' as its list of rows'''
+    if isinstance(value, SubjectTable):
+        return value.to_list()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Converter holding the config and the compiled re expressions
+
+class RtfConverter:
+    '''
+    This class converts RTF files to JSON without using the module-level state
+    It holds the config, the RTF tags and the compiled re expressions, which are never
+    changed once it is created, so a single converter can be used by many threads at once
+    The counters of each file are kept in an 'RtfDocument' made for each conversion
+    The module-level functions use the converter made by 'load_config'
+    '''
+
+    def __init__(self, config_path="config.ini", overrides=None, config=None):
+        '''
+        The config file is read from 'config_path', and the overrides given as
+        {section: {option: value}} replace its options,
+        unless a config that is already read is given in 'config'
+        '''
+        if config is None:
+            config = read_config(config_path, overrides)
+        self.config = config
+        self.rtf_tags = config["RTF TAGS"]
+        self.re_expressions = config["RE EXPRESSIONS"]
+        self.header_alignment = config['HEADER ALIGNMENT']
+        self.output_format = config.get('OUTPUT', 'format', fallback="pretty")
+        if self.output_format not in ("pretty", "compact", "ndjson"):
+            raise ValueError(f"Unknown output format {self.output_format} in {config_path}")
+        self.layout = config.get('OUTPUT', 'layout', fallback="pages")
+        if self.layout not in ("pages", "tables"):
+            raise ValueError(f"Unknown output layout {self.layout} in {config_path}")
+
+        self.header_pattern = re.compile(self.re_expressions['header'])
+        self.header_style_pattern = re.compile(self.re_expressions['headerstyle'])
+        self.font_pattern = re.compile(self.re_expressions['font pattern'])
+
+        # Commonly used RTF tags, searched for all at once by 'check_rtf'
+        self.schema_tags = [self.rtf_tags["page break"],self.rtf_tags['header'],
+                            self.rtf_tags['title'],self.rtf_tags["row start"],
+                            self.rtf_tags["row end"],self.rtf_tags["cell end"]]
+        schema_expression = "|".join(re.escape(tag) for tag in self.schema_tags)
+        self.schema_pattern = re.compile(schema_expression)
+        self.schema_bytes_pattern = re.compile(schema_expression.encode("utf-8"))
+
+        # Subject rows are kept as tuples in a 'SubjectTable' instead of dictionaries,
+        # with one column headers tuple for all the tables with the same column headers
+        self.compact_rows = config.getboolean('PROCESSING', 'compact rows', fallback=False)
+        # The values of each table column are converted to the type found for the column
+        self.column_types = config.getboolean('OUTPUT', 'column types', fallback=False)
+
+    def convert(self, source, output_file=None):
+        '''
+        This function converts an RTF file, given as its content in bytes or as its path,
+        and returns the JSON content as a dictionary of 'fonts' and 'data'
+        The file is only read when a path is given, and the JSON content is only
+        written when an output file is given, in the 'format' and 'layout' of the config
+        When the pages are written as stitched tables with 'column types', each table is typed
+        as a whole, so the pages returned keep the text values and no column types
+        A ValueError is raised if the file does not adhere to the schema
+        or cannot be converted
+        '''
+        # The pages written as stitched tables are typed table by table
+        typed = output_file is None or self.layout == "pages"
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            document = RtfDocument("<bytes>", templates={}, typed=typed, schemas={})
+            rtf_content = clean_rtf_content(bytes(source))
+        else:
+            document = RtfDocument(os.path.basename(source), templates={}, typed=typed, schemas={})
+            with open(source, 'rb') as file:
+                rtf_content = clean_rtf_content(file.read())
+        if not self.check_rtf(rtf_content, document):
+            raise ValueError(f"RTF File {document.name} does not conform to schema")
+        try:
+            fonts = self.extract_font_details(rtf_content)
+            page_breaks = extract_page_breaks(rtf_content)
+            document.numpages = len(page_breaks) - 1
+            pages = []
+            for i in range(document.numpages):
+                document.page = i + 1
+                pages.append(self.extract_page_content(
+                    rtf_content[page_breaks[i] : page_breaks[i+1]], document))
+        # A row with more cells than column headers raises an IndexError
+        except (AttributeError, IndexError) as e:
+            log_exception(document.name + " cannot be converted due to " + "\n",
+                          stage="convert_rtf", file=document.name)
+            raise ValueError(f"RTF File {document.name} cannot be converted") from e
+        if output_file is not None:
+            write_json_output(output_file, fonts, pages, self.output_format, self.layout)
+        return {'fonts': fonts, 'data': pages}
+
+    def check_rtf(self, rtf_content, document=None):
+        '''
+        This function checks whether the RTF content adheres to the schema
+        The content can be a string, or the bytes of a memory-mapped file
+        All the tags are searched for at once with a single re expression,
+        and the search stops as soon as every tag has been found
+        '''
+        name = document.name if document is not None else None
+        if isinstance(rtf_content, str):
+            schema_pattern = self.schema_pattern
+            missing_tags = set(self.schema_tags)
+        else:
+            schema_pattern = self.schema_bytes_pattern
+            missing_tags = {tag.encode("utf-8") for tag in self.schema_tags}
+        for match in schema_pattern.finditer(rtf_content):
+            missing_tags.discard(match.group())
+            if not missing_tags:
+                return True
+
+        # The first missing tag in the order of the config file is logged
+        for i in self.schema_tags:
+            if i in missing_tags or i.encode("utf-8") in missing_tags:
+                debug_print(i + " not in rtf")
+                # If RTF tag is not present, the RTF does not adhere to the schema
+                log_exception(i + " not in RTF \n", stage="check_rtf", file=name)
+                break
+        return False
+
+    def extract_font_details(self, rtf_content):
+        '''This function extracts the font details of the RTF content
+        The fonts are stored along with the font ID in a dictionary
+        '''
+        return self.extract_prelude(rtf_content)['fonts']
+
+    def extract_prelude(self, rtf_content):
+        '''This function reads the '\\fonttbl', '\\colortbl' and '\\stylesheet' groups
+        of the RTF content, before the first page break
+        Each group is found by its braces, so only the groups themselves are read,
+        however long the rest of the content is
+        It returns a dictionary of:
+        - 'fonts', the font name of each font ID, such as {'f1': 'Times New Roman'}
+        - 'colors', the '#rrggbb' color of each color number, None for the default color
+        - 'styles', the style name of each style ID, such as {'s0': 'Normal'}
+        '''
+        prelude_end = rtf_content.find(self.rtf_tags["page break"])
+        if prelude_end == -1:
+            prelude_end = len(rtf_content)
+        braces = BraceIndex(rtf_content)
+        prelude = {'fonts': {}, 'colors': [], 'styles': {}}
+
+        def group_end(start):
+            # A group that is not closed runs to the first page break
+            end = braces.group_end(start)
+            return prelude_end if end == -1 else end
+
+        font_table = rtf_content.find('{\\fonttbl', 0, prelude_end)
+        if font_table == -1:
+            debug_print("No font table found")
+        else:
+            for entry in braces.groups(font_table + 1, group_end(font_table)):
+                match = self.font_pattern.search(braces.group_text(*entry).replace('\n', ''))
+                if match:
+                    font_id, font_name = match.groups()
+                    prelude['fonts']['f'+font_id] = font_name
+
+        color_table = rtf_content.find('{\\colortbl', 0, prelude_end)
+        if color_table != -1:
+            colors = rtf_content[color_table + 10 : group_end(color_table)]
+            for color in colors.split(';')[:-1]:
+                match = COLOR_PATTERN.search(color)
+                prelude['colors'].append(
+                    '#{:02x}{:02x}{:02x}'.format(*map(int, match.groups())) if match else None)
+
+        stylesheet = rtf_content.find('{\\stylesheet', 0, prelude_end)
+        if stylesheet != -1:
+            for entry in braces.groups(stylesheet + 1, group_end(stylesheet)):
+                style = braces.group_text(*entry)
+                match = STYLE_PATTERN.search(style)
+                style_id = match.group(1) + match.group(2) if match else 's0'
+                name = STYLE_WORD_PATTERN.sub('', style).strip().rstrip(';').strip()
+                prelude['styles'][style_id] = name
+        return prelude
+
+    def extract_header(self, page_content, document, tokens=None, braces=None):
+        '''This function extracts the page header of the page 'document.page'
+        The end of the '{\\header' group is found with the brace index of the page
+        The PAGE and NUMPAGES fields are replaced with the counters of the document
+        It returns the header and the position in the page after the header
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        if braces is None:
+            braces = BraceIndex(page_content)
+        headers = {}
+        header_end = 0
+        try:
+            header_start = find_token(tokens, 'header').start
+            # Finding the '\header' tag to find the header
+            header_end = max(braces.group_end(header_start), 0)
+
+            headers = self.fill_header(
+                self.parse_header(page_content, header_start, header_end), document)
+            debug_print("Header extracted successfully")
+
+        # Used to check whether the header content is extracted successfully
+        except AttributeError:
+            debug_print("Header not found")
+            log_exception("Header not extracted successfully in page " + str(document.page),
+                          stage="extract_header", page=document.page, file=document.name)
+        return headers, header_end+1
+
+    def parse_header(self, page_content, header_start, header_end):
+        '''This function reads the lines of the header between 'header_start' and 'header_end'
+        It returns the text and alignment of each line, with the PAGE and NUMPAGES fields
+        left in the text
+        '''
+        header = self.header_pattern.findall(page_content, header_start, header_end)
+        headerstyle = self.header_style_pattern.findall(page_content, header_start, header_end)
+        return [(header_line, headerstyle[h][0]) for h, header_line in enumerate(header)]
+
+    def fill_header(self, header_lines, document):
+        '''This function replaces the PAGE and NUMPAGES fields of the header lines
+        with the counters of the document
+        It returns the dictionary of the header content with the alignment of each line
+        '''
+        headers = {}
+        for header_line, alignment in header_lines:
+            if '{\\field' in header_line:
+                header_line = header_line.replace(
+                    '{\\field{\\*\\fldinst { PAGE }}}{',str(document.page)).replace(
+                        '}{\\field{\\*\\fldinst { NUMPAGES }}}',str(document.numpages))
+            headers[header_line]=alignment
+        return headers
+
+    def extract_page_head(self, page_content, document, tokens=None, braces=None):
+        '''This function extracts the header, title and column headers of the page
+        SAS repeats the same header, title rows and column header row on every page,
+        so when the document has a 'templates' cache, each distinct page head is only read once
+        The head is looked up by its text, up to the end of the column header row,
+        and only its PAGE and NUMPAGES fields are filled in for the page
+        It returns the header, title, column headers and the position in the page
+        after the column headers
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        key = None
+        if document.templates is not None:
+            head_end = find_page_head_end(tokens)
+            if head_end != -1:
+                key = page_content[:head_end]
+                template = document.templates.get(key)
+                if template is not None:
+                    header_lines, title, column_headers, position = template
+                    return (self.fill_header(header_lines, document), list(title),
+                            list(column_headers), position)
+
+        if braces is None:
+            braces = BraceIndex(page_content)
+        header, position = self.extract_header(page_content, document, tokens, braces)
+        title, position = self.extract_title(page_content, document, tokens, position, braces)
+        column_headers, position = self.extract_column_headers(page_content, document, tokens,
+                                                               position, braces)
+        # Only a head that was read in full, and ends where it was looked up, is kept
+        if (key is not None and position == head_end + 1 and header and column_headers
+                and len(document.templates) < TEMPLATE_CACHE_SIZE):
+            header_start = find_token(tokens, 'header').start
+            header_lines = self.parse_header(page_content, header_start,
+                                             braces.group_end(header_start))
+            document.templates[key] = (header_lines, tuple(title), tuple(column_headers),
+                                       position)
+        return header, title, column_headers, position
+
+    def extract_title(self, page_content, document, tokens=None, position=0, braces=None):
+        '''This function extracts the table title using the '\\trhdr' RTF tag
+        The title of each row is the first cell group of the row
+        It returns the titles and the position in the page after the title rows
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        if braces is None:
+            braces = BraceIndex(page_content)
+        try:
+            trhdr = []
+            end_row = []
+            for t in tokens:
+                if t.start < position:
+                    continue
+                if t.word == 'trhdr':
+                    trhdr.append(t.start)
+                elif t.word == 'row':
+                    end_row.append(t.end)
+            title = []
+            for i in range(len(trhdr)-1):
+                title_line=braces.first_cell(trhdr[i], end_row[i])
+                if title_line is None:
+                    raise AttributeError("No title cell")
+                title_line=CONTROL_WORD_PATTERN.sub("",title_line).strip()
+                title.append(title_line)
+            debug_print("Title extracted successfully")
+            if len(trhdr)>1:
+                return title, end_row[len(trhdr)-2]+1
+            return title, trhdr[0]
+
+        # Used to check whether the table title is extracted successfully
+        except AttributeError:
+            debug_print("No title found")
+            log_exception("Title not extracted successfully in page " + str(document.page),
+                          stage="extract_title", page=document.page, file=document.name)
+        return None
+
+    def extract_column_headers(self, page_content, document, tokens=None, position=0,
+                               braces=None):
+        '''This function extracts the column headers from the cell groups of the row
+        It returns the column headers and the position in the page after the row
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        if braces is None:
+            braces = BraceIndex(page_content)
+        try:
+            end_row = find_token(tokens, 'row', position).end
+
+            headers = braces.cells(position, end_row)
+            column_headers = [CONTROL_WORD_PATTERN.sub("", h).strip() for h in headers]
+            debug_print("Column headers extracted successfully")
+
+        # Used to check whether the column headers are extracted successfully
+        except AttributeError:
+            debug_print("Column headers not found")
+            log_exception("Column headers not extracted successfully in page "
+                          + str(document.page), stage="extract_column_headers",
+                          page=document.page, file=document.name)
+            column_headers = []
+        return column_headers, end_row+1
+
+    def iter_table_rows(self, page_content, column_headers, document, tokens=None, position=0,
+                        raw=False):
+        '''This function reads the rows of the table one at a time
+        Each row runs from a '\\trowd' tag to the next '{\\row}' group
+        For each row, it yields the position in the page after the row, and the values
+        of the row in a tuple, or None if the row is empty
+        The last row is left out if it holds the footnotes, found by the '\\keepn' tag
+        A row is only read once the next row is found, so a single row is held at a time
+        With 'raw' set, the values are kept as text
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        row_starts = deque()
+        keepn = []
+        last_row = None
+        for t in tokens:
+            if t.start < position:
+                continue
+            if t.word == 'trowd':
+                row_starts.append(t.start)
+            elif t.word == 'row' and row_starts:
+                if last_row is not None:
+                    yield last_row[1], self.parse_table_row(page_content, last_row,
+                                                            len(column_headers), raw)
+                last_row = (row_starts.popleft(), t.end)
+            elif t.word == 'keepn':
+                keepn.append(t)
+        if last_row is not None and not any(last_row[0] <= k.start and k.end <= last_row[1]
+                                            for k in keepn):
+            yield last_row[1], self.parse_table_row(page_content, last_row,
+                                                    len(column_headers), raw)
+
+    def parse_table_row(self, page_content, row, column_count, raw=False):
+        '''This function reads the values of a row, given by its start and end in the page
+        The values are in the order of the column headers, and whole numbers are
+        stored as integers, unless 'raw' is set to keep every value as text
+        It returns None if the row is empty
+        '''
+        row_data = CELL_PATTERN.findall(page_content, row[0], row[1])
+        row_data = list(filter(None, [CONTROL_WORD_PATTERN.sub("" , rd).strip()
+                                      for rd in row_data]))
+        if not row_data:
+            return None
+        if len(row_data) > column_count:
+            raise IndexError(f"Row has {len(row_data)} cells for {column_count} column headers")
+        if raw:
+            return tuple(row_data)
+        return tuple(int(row_data_values) if row_data_values.isdigit() else row_data_values
+                     for row_data_values in row_data)
+
+    def table_schema(self, column_headers, document):
+        '''This function returns the column headers as a tuple,
+        which is the same tuple for every table of the document with the same column headers
+        '''
+        columns = tuple(column_headers)
+        if document.schemas is None:
+            return columns
+        return document.schemas.setdefault(columns, columns)
+
+    def extract_table_data(self, page_content, column_headers, document, tokens=None,
+                           position=0):
+        '''This function extracts the table data
+        The data in each row is mapped to the column headers in a dictionary,
+        or kept in a 'SubjectTable' when 'compact rows' is set in the config
+        The values are kept as text when they are typed later, by 'stitch_pages'
+        It returns the table data and the position in the page after the last row
+        '''
+        subjects = (SubjectTable(self.table_schema(column_headers, document)) if self.compact_rows
+                    else [])
+        try:
+            for position, row_values in self.iter_table_rows(
+                    page_content, column_headers, document, tokens, position,
+                    raw=self.column_types and not document.typed):
+                if row_values is None:
+                    continue
+                if self.compact_rows:
+                    subjects.rows.append(row_values)
+                else:
+                    subjects.append(dict(zip(column_headers, row_values)))
+            debug_print(
+                "Table data extracted successfully")
+        # Used to check whether the table data is extracted successfully
+        except AttributeError:
+            debug_print("Table data not found")
+            log_exception("Table data not extracted successfully in page " + str(document.page),
+                          stage="extract_table_data", page=document.page, file=document.name)
+            subjects = (SubjectTable(self.table_schema(column_headers, document))
+                        if self.compact_rows else [])
+        return subjects, position
+
+    def extract_typed_table(self, page_content, column_headers, document, tokens=None,
+                            position=0):
+        '''This function extracts the table data with a type for each column
+        The rows are all read as text first, then the type of each column is found
+        over the whole table by 'type_columns', and the values are converted column by column
+        It returns the column types, the table data and the position in the page
+        after the last row
+        '''
+        rows = []
+        try:
+            for position, row_values in self.iter_table_rows(
+                    page_content, column_headers, document, tokens, position, raw=True):
+                if row_values is not None:
+                    rows.append(row_values)
+            debug_print("Table data extracted successfully")
+        # Used to check whether the table data is extracted successfully
+        except AttributeError:
+            debug_print("Table data not found")
+            log_exception("Table data not extracted successfully in page " + str(document.page),
+                          stage="extract_table_data", page=document.page, file=document.name)
+            rows = []
+        column_types, rows = type_columns(len(column_headers), rows)
+        if self.compact_rows:
+            subjects = SubjectTable(self.table_schema(column_headers, document), rows)
+        else:
+            subjects = [dict(zip(column_headers, row)) for row in rows]
+        return column_types, subjects, position
+
+    def extract_footnotes(self, page_content, document, position=0, braces=None):
+        '''This function extracts the footnotes from the first cell group after the table'''
+        if braces is None:
+            braces = BraceIndex(page_content)
+        try:
+            footnotes = [braces.first_cell(position)]
+            if footnotes[0] is None:
+                raise AttributeError("No footnote cell")
+            debug_print(f"Footer found: {footnotes}")
+            debug_print("Footnotes extracted successfully")
+        # Used to check whether the footnotes are extracted successfully
+        except AttributeError:
+            debug_print("Footnotes not found")
+            message = "Footnotes not extracted successfully in page " + str(document.page)
+            log_exception(message + "\n", stage="extract_footnotes", page=document.page,
+                          file=document.name)
+            footnotes = []
+        return footnotes
+
+    def extract_footer(self, footnotes, document):
+        '''This function finds the table footer
+        Is found by searching for 'Source'/'Dataset'
+        '''
+        try:
+            if not footnotes :
+                return [], []
+            footnote = footnotes[0]
+            if "Source" in footnote :
+                i = footnote.find("Source")
+                return footnote[:i] , footnote[i:]
+            if "Dataset" in footnote :
+                i = footnote.find("Dataset")
+                return footnote[:i] , footnote[i:]
+            return footnote, ""
+        # Used to check whether the footer is extracted successfully
+        except AttributeError:
+            debug_print("Footer not found")
+            log_exception("Footer not extracted successfully in page " + str(document.page),
+                          stage="extract_footer", page=document.page, file=document.name)
+        return [], []
+
+    def extract_page_content(self, page_content, document, tokens=None):
+        '''
+        This function extracts the content of the page 'document.page'
+        It returns the page details as a dictionary
+        '''
+        page_details = {}
+        for key, value in self.iter_page_members(page_content, document, tokens,
+                                                 self.compact_rows):
+            if key == 'subjects' and not isinstance(value, (list, SubjectTable)):
+                value = (SubjectTable(self.table_schema(page_details['column headers'], document),
+                                      list(value)) if self.compact_rows else list(value))
+            page_details[key] = value
+        return page_details
+
+    def iter_page_members(self, page_content, document, tokens=None, values=False):
+        '''
+        This function extracts the content of the page 'document.page' one part at a time
+        It yields the (key, value) pairs of the page details in order
+        The value of 'subjects' is an iterator that reads the table one row at a time,
+        so the rows can be written as they are read, without holding the whole table
+        With 'values' set, the rows are read as tuples of their values, in the order of the
+        column headers, instead of dictionaries
+        When 'column types' is set in the config, the table is read in full to find the type
+        of each column, and given as the table data after the 'column types' pair,
+        unless the document is not 'typed', when the 'column types' are None
+        The footnotes are found after the last row, so the subjects must be read
+        before the next pair is asked for
+        The page tokens and brace index are passed from one function to the next along with
+        the position reached in the page, so the page is not searched again
+        '''
+        if tokens is None:
+            tokens = tokenize_rtf(page_content)
+        braces = BraceIndex(page_content)
+        header, title, column_headers, position = self.extract_page_head(
+            page_content, document, tokens, braces)
+        yield 'header', header
+        yield 'title', title
+        yield 'column headers', column_headers
+
+        def subjects(raw=False):
+            nonlocal position
+            try:
+                for position, row_values in self.iter_table_rows(
+                        page_content, column_headers, document, tokens, position, raw):
+                    if row_values is not None:
+                        yield row_values if values else dict(zip(column_headers, row_values))
+            except AttributeError:
+                debug_print("Table data not found")
+                log_exception("Table data not extracted successfully in page "
+                              + str(document.page), stage="extract_table_data",
+                              page=document.page, file=document.name)
+
+        if self.column_types and not document.typed:
+            # The values are typed with the rest of the table by 'stitch_pages'
+            yield 'column types', None
+            yield 'subjects', subjects(raw=True)
+        elif self.column_types:
+            column_types, table_data, position = self.extract_typed_table(
+                page_content, column_headers, document, tokens, position)
+            yield 'column types', column_types
+            yield 'subjects', table_data
+        else:
+            yield 'subjects', subjects()
+        footnotes = self.extract_footnotes(page_content, document, position, braces)
+        footnotes, footer = self.extract_footer(footnotes, document)
+        yield 'footnotes', footnotes
+        yield 'footer', footer
+
+# Function to get the counters of the file being converted by the module functions
+
+def module_document():
+    '''This function returns the counters of the file being converted
+    by the module-level functions, which are kept in CURRENT_FILE, PAGE and NUMPAGES,
+    with the page heads cached in PAGE_TEMPLATES and the column headers in PAGE_SCHEMAS
+    The pages are only typed one by one when they are not stitched into tables
+    in the JSON output
+    '''
+    return RtfDocument(CURRENT_FILE, PAGE, NUMPAGES, PAGE_TEMPLATES,
+                       typed=OUTPUT_LAYOUT == "pages" or OUTPUT_SINK != "json",
+                       schemas=PAGE_SCHEMAS)
 
 # Function to check if RTF File adheres to the schema
-def check_rtf(file_path):
+def check_rtf(file_path, rtf_content=None):
     '''
     This is a function that checks whether the RTF File adheres to the schema mentioned.
-    The adherence to the schema is found by checking whether 
+    The adherence to the schema is found by checking whether
     the commonly used RTF control tags are used in the RTF file.
-    The RTF file is loaded, and then the content is read using the "file.read()" function
-    A list is created to store the RTF tags
-    An iterator is used to parse the list and check if all the tags are present in the file
-    '''
-    with open(file_path, 'r', encoding = "utf-8") as file:
-        rtf_content = file.read().replace("{\\line}\n", " ").replace("\\~", " ")
-     # Commonly used RTF tags
-    rtf_tags = [RTF_tags["page break"],RTF_tags['header'],
-                RTF_tags['title'],RTF_tags["row start"],
-                RTF_tags["row end"],RTF_tags["cell end"]]
-    flag = True
-    for i in rtf_tags:
-        if i in rtf_content:
-            continue
+    The content that is already read for the conversion can be passed in, as a string
+    or as a memory-mapped file, otherwise the RTF file is loaded and read
+    '''
+    if rtf_content is None:
+        with open(file_path, 'r', encoding = "utf-8") as file:
+            rtf_content = file.read()
+    return CONVERTER.check_rtf(rtf_content, RtfDocument(os.path.basename(file_path)))
 
-        debug_print(i + " not in rtf")
-        # If RTF tag is not present, the RTF does not adhere to the schema
-        log_file_exceptions.write(i + " not in RTF \n")
-        flag = False
-        break
-    return flag
+# Function to reject an RTF File that does not adhere to the schema
+def reject_rtf(file_path):
+    '''
+    This function reports an RTF file that does not adhere to the schema
+    It returns the status and remarks of the file
+    '''
+    file = os.path.basename(file_path)
+    debug_print(f"RTF File {file} does not conform to schema, cannot be converted")
+    log_exception(
+        f"RTF File {file} does not conform to schema, "
+        "cannot be converted\n", stage="check_rtf"
+        )
+    return "Failed", "No remarks Found"
 
 # Function to extract font details from RTF content
 def extract_font_details(rtf_content):
@@ -121,25 +1298,174 @@ def extract_font_details(rtf_content):
     The fonts are stored along with the font ID in a dictionary
     These key value pairs will be used later to extract the font details on each section
     '''
-    # Extract font table
-    font_table_pattern = re.compile(RE_expressions['font table'], re.DOTALL)
+    return CONVERTER.extract_font_details(rtf_content)
 
-    font_table_match = font_table_pattern.search(rtf_content)
-    if font_table_match:
-        font_table = font_table_match.group(1)
+# Function to read the font, color and style tables of an RTF file
 
-    else:
-        debug_print("No font table found")
-        return {}
+def extract_prelude(rtf_content):
+    '''This function reads the '\\fonttbl', '\\colortbl' and '\\stylesheet' groups
+    before the first page break, and returns the fonts, colors and styles
+    '''
+    return CONVERTER.extract_prelude(rtf_content)
 
-    # Extract font details from font table
-    font_pattern = re.compile(RE_expressions['font pattern'])
+# Function to tokenize the RTF content
 
-    fonts = {}
-    for match in font_pattern.finditer(font_table):
-        font_id, font_name = match.groups()
-        fonts['f'+font_id] = font_name
-    return fonts
+def tokenize_rtf(page_content):
+    '''This function reads the page content and returns its structural tokens
+    Each token holds the control word ('trhdr', 'trowd', 'keepn')
+    or group ('header' for '{\\header', 'row' for '{\\row}') with its start and end offsets
+    The tokens are returned in the order they appear in the page
+    The extractors use these tokens instead of searching the page content again
+    '''
+    tokens = []
+    # A literal search for each tag is much faster than one combined re expression
+    for word, tag in RTF_TOKENS.items():
+        start = page_content.find(tag)
+        while start != -1:
+            tokens.append(RtfToken(word, start, start + len(tag)))
+            start = page_content.find(tag, start + len(tag))
+    tokens.sort(key=lambda token: token.start)
+    return tokens
+
+# Function to find the first token of a type in the RTF content
+
+def find_page_head_end(tokens):
+    '''This function returns the end of the column header row, the row that ends
+    the '\\trhdr' rows at the start of the page, or -1 if the page has no such row
+    The tokens after the first row that is not a '\\trhdr' row are not read
+    '''
+    last_trhdr = -1
+    for i, t in enumerate(tokens):
+        if t.word == 'trhdr':
+            last_trhdr = i
+        elif (t.word == 'trowd' and last_trhdr != -1
+              and (i + 1 == len(tokens) or tokens[i + 1].word != 'trhdr')):
+            break
+    for i in range(last_trhdr + 1, len(tokens) if last_trhdr != -1 else 0):
+        if tokens[i].word == 'row':
+            return tokens[i].end
+    return -1
+
+def find_token(tokens, word, position=0):
+    '''This function returns the first token with the given control word
+    that starts at or after the given position, or None if there is no such token
+    '''
+    for token in tokens:
+        if token.word == word and token.start >= position:
+            return token
+    return None
+
+# Index of the brace groups of the RTF content
+
+class BraceIndex:
+    '''
+    This class finds the extent of the '{...}' groups of the content of a page
+    The braces are found with literal searches, jumping from one brace to the next,
+    and the closing brace of every group that is passed is kept in 'pairs',
+    so each part of the page is searched at most once and a group found before
+    is looked up directly
+    Braces escaped as '\\{' and '\\}' are not counted
+    '''
+    __slots__ = ('content', 'pairs')
+
+    def __init__(self, content):
+        self.content = content
+        self.pairs = {}
+
+    def is_escaped(self, position):
+        '''This function checks if the brace at the position is escaped,
+        by an odd number of backslashes before it
+        '''
+        start = position - 1
+        while start >= 0 and self.content[start] == '\\':
+            start -= 1
+        return (position - start) % 2 == 0
+
+    def group_end(self, start):
+        '''This function returns the position of the '}' that closes the group opened
+        by the '{' at 'start', or -1 if the group is not closed
+        '''
+        end = self.pairs.get(start)
+        if end is not None:
+            return end
+        content = self.content
+        pairs = self.pairs
+        opened = [start]
+        next_open = content.find('{', start + 1)
+        next_close = content.find('}', start + 1)
+        while next_close != -1:
+            if next_open != -1 and next_open < next_close:
+                if content[next_open - 1] != '\\' or not self.is_escaped(next_open):
+                    opened.append(next_open)
+                next_open = content.find('{', next_open + 1)
+            else:
+                if content[next_close - 1] != '\\' or not self.is_escaped(next_close):
+                    pairs[opened.pop()] = next_close
+                    if not opened:
+                        return next_close
+                next_close = content.find('}', next_close + 1)
+        return -1
+
+    def cells(self, start, end=None):
+        '''This function yields the text of the '{...\\cell}' groups between 'start' and 'end'
+        Groups that are not cells are searched for cells inside them
+        Escaped braces '\\{' do not open a group
+        '''
+        content = self.content
+        if end is None:
+            end = len(content)
+        group_start = content.find('{', start, end)
+        while group_start != -1:
+            if content[group_start - 1] == '\\' and self.is_escaped(group_start):
+                group_start = content.find('{', group_start + 1, end)
+                continue
+            group_end = self.group_end(group_start)
+            if group_end == -1:
+                return
+            if content.startswith('\\cell', group_end - 5, group_end):
+                yield content[group_start + 1 : group_end - 5]
+                group_start = content.find('{', group_end + 1, end)
+            else:
+                group_start = content.find('{', group_start + 1, end)
+
+    def groups(self, start, end):
+        '''This function yields the start and end of each group between 'start' and 'end',
+        without going into the groups inside them
+        '''
+        content = self.content
+        group_start = content.find('{', start, end)
+        while group_start != -1:
+            if content[group_start - 1] == '\\' and self.is_escaped(group_start):
+                group_start = content.find('{', group_start + 1, end)
+                continue
+            group_end = self.group_end(group_start)
+            if group_end == -1:
+                return
+            yield group_start, group_end
+            group_start = content.find('{', group_end + 1, end)
+
+    def group_text(self, start, end):
+        '''This function returns the text of the group from 'start' to 'end',
+        leaving out the groups inside it, such as the '{\\*\\panose ...}' of a font
+        A group left out ends the control word before it, so it is replaced by a space
+        when text follows it, and by nothing when the next control word follows it
+        '''
+        content = self.content
+        text = []
+        position = start
+        for inner_start, inner_end in self.groups(start + 1, end):
+            text.append(content[position:inner_start])
+            position = inner_end + 1
+            if not content.startswith('\\', position):
+                text.append(" ")
+        text.append(content[position:end + 1])
+        return "".join(text)
+
+    def first_cell(self, start, end=None):
+        '''This function returns the text of the first cell between 'start' and 'end',
+        or None if there is no cell
+        '''
+        return next(self.cells(start, end), None)
 
 # Function to extract page breaks in the RTF File
 
@@ -155,153 +1481,67 @@ def extract_page_breaks(rtf_content):
 
 # Function to extract the page header
 
-def extract_header(page_content):
+def extract_header(page_content, tokens=None, page_no=None, braces=None):
     '''This function extracts the page header using the '\\header' RTF tag
     The content enclosed within the '\\header' tag, is found,
     and the data is extracted using an re expression
+    The page number is given in 'page_no', or else the PAGE count is incremented
+    It returns the header and the position in the page after the header
     '''
     global PAGE
-    PAGE += 1
-    try:
-        header_start = re.search(r'{\\header' , page_content).start()
-        # Finding the '\header' tag to find the header
-        i = header_start+1
-        flag = 0
-        header_end = 0
-        # This while loop is used to find the header content in the page
-        # It parses through the data to find the'}'symbol
-        while i < len(page_content):
-            if page_content[i] == '{' :
-                flag += 1
-            if page_content[i] == '}' :
-                if flag == 0 :
-                    header_end = i
-                    break
-                flag -= 1
-            i += 1
-
-        header = re.findall(RE_expressions['header'] , page_content[header_start : header_end])
-        headerstyle = re.findall(RE_expressions['headerstyle']
-                                ,page_content[header_start : header_end])
-        #Dict to store the header content with the alignment
-        headers={}
-        for h, header_line in enumerate(header):
-            header_line = header_line.replace(
-                '{\\field{\\*\\fldinst { PAGE }}}{',str(PAGE)).replace(
-                    '}{\\field{\\*\\fldinst { NUMPAGES }}}',str(NUMPAGES))
-            headers[header_line]=headerstyle[h][0]
-        debug_print("Header extracted successfully")
-
-    # Used to check whether the header content is extracted successfully
-    except AttributeError:
-        debug_print("Header not found")
-        log_file_exceptions.write("Header not extracted successfully in page " + str(PAGE))
-    return headers, page_content[header_end+1:]
+    if page_no is None:
+        PAGE += 1
+    else:
+        PAGE = page_no
+    return CONVERTER.extract_header(page_content, module_document(), tokens, braces)
 
 # Function to extract the table title
 
-def extract_title(page_content):
+def extract_title(page_content, tokens=None, position=0, braces=None):
     '''This function is used to extract the table title using the '\\trhdr' RTF tag
     The '\\row' tag is used to find the end of the title rows
     Re expressions are used to extract the titles data
+    It returns the titles and the position in the page after the title rows
     '''
+    return CONVERTER.extract_title(page_content, module_document(), tokens, position, braces)
 
-    try:
-        trhdr = []
-        end_row = []
-        for t in re.finditer(r'\\trhdr' , page_content) :
-            trhdr.append(t.start())
-        for e in re.finditer(r'{\\row}' , page_content) :
-            end_row.append(e.end())
-        title = []
-        for i in range(len(trhdr)-1):
-            title_line=re.search(r'{(.+)\\cell}',page_content[trhdr[i]:end_row[i]]).group()[1:-6]
-            title_line=re.sub(r"\\(\w+)","",title_line).strip()
-            title.append(title_line)
-        debug_print("Title extracted successfully")
-        if len(trhdr)>1:
-            return title, page_content[end_row[len(trhdr)-2]+1:]
-        return title, page_content[trhdr[0]:]
-
-    # Used to check whether the table title is extracted successfully
-    except AttributeError:
-        debug_print("No title found")
-        log_file_exceptions.write("Title not extracted successfully in page " + str(PAGE))
 # Function to extract the table column headers
 
-def extract_column_headers(page_content):
+def extract_column_headers(page_content, tokens=None, position=0, braces=None):
     '''This function extracts the column headers
     The '\\row' tag is used to find the end of the column headers row
+    It returns the column headers and the position in the page after the row
     '''
-    try:
-        end_row = re.search(r'{\\row}', page_content).end()
-
-        headers = re.findall(r'{(.+)\\cell}' , page_content[:end_row])
-        column_headers = [re.sub(r"\\(\w+)", "", h).strip() for h in headers]
-        debug_print("Column headers extracted successfully")
-
-    # Used to check whether the column headers are extracted successfully
-    except AttributeError:
-        debug_print("Column headers not found")
-        log_file_exceptions.write("Column headers not extracted successfully in page " + str(PAGE))
-        column_headers = []
-    return column_headers, page_content[end_row+1:]
+    return CONVERTER.extract_column_headers(page_content, module_document(), tokens, position,
+                                            braces)
 
 # Function to extract the table data
 
-def extract_table_data(page_content, column_headers):
+def extract_table_data(page_content, column_headers, tokens=None, position=0):
     '''This function is used to extract the table data
     The '\\trowd' tag is used to find the beginning of each row
     The '\\row' tag is used to find the end of each row
     The data in each row is extracted, and mapped to the column headers in a dictionary
     The presence of footnotes in the page is checked using the '\\keepn' tag
+    It returns the table data and the position in the page after the last row
     '''
-    try:
-        trowd = []
-        end_row = []
-        for t in re.finditer(r'\\trowd' , page_content) :
-            trowd.append(t.start())
-        for e in re.finditer(r'{\\row}' , page_content) :
-            end_row.append(e.end())
-
-        subjects = []
-        no_of_rows = len(trowd)
-        if re.search(r'\\keepn', page_content[trowd[-1]:end_row[-1]]):
-            no_of_rows -= 1
-        for r in range(no_of_rows):
-            row_data = re.findall(r'{(.+)\\cell}' , page_content[trowd[r]:end_row[r]])
-            row_data = list(filter(None, [re.sub(r"\\\w+" , "" , rd).strip() for rd in row_data]))
-            if row_data :
-                subject_details = {}
-                for i, row_data_values in enumerate(row_data) :
-                    if not row_data_values.isdigit():
-                        subject_details[column_headers[i]] = row_data_values
-                    else:
-                        subject_details[column_headers[i]] = int(row_data_values)
-
-                subjects.append(subject_details)
-        debug_print(
-            "Table data extracted successfully")
-    # Used to check whether the table data is extracted successfully
-    except AttributeError:
-        debug_print("Table data not found")
-        log_file_exceptions.write("Table data not extracted successfully in page " + str(PAGE))
-        subjects = []
-    return subjects, page_content[end_row[r]:]
+    return CONVERTER.extract_table_data(page_content, column_headers, module_document(),
+                                        tokens, position)
+
+# Function to extract the table data with a type for each column
+
+def extract_typed_table(page_content, column_headers, tokens=None, position=0):
+    '''This function is used to extract the table data when 'column types' is set
+    The type of each column is found over the whole table, and its values converted
+    It returns the column types, the table data and the position in the page after the last row
+    '''
+    return CONVERTER.extract_typed_table(page_content, column_headers, module_document(),
+                                         tokens, position)
+
 # Function to extract the table footnotes
-def extract_footnotes(page_content):
-    '''This function is used to extract the footnotes using an re expression'''
-    try:
-        footnotes = [re.search(r'{(.+)\\cell}', page_content).group()[1:-6]]
-        debug_print(f"Footer found: {footnotes}")
-        debug_print("Footnotes extracted successfully")
-    # Used to check whether the footnotes are extracted successfully
-    except AttributeError:
-        debug_print("Footnotes not found")
-        message = "Footnotes not extracted successfully in page " + str(PAGE)
-        log_file_exceptions.write(message + "\n")
-        footnotes = []
-    return footnotes
+def extract_footnotes(page_content, position=0, braces=None):
+    '''This function is used to extract the footnotes from the first cell after the table'''
+    return CONVERTER.extract_footnotes(page_content, module_document(), position, braces)
 
 # Function to extract the table footer
 
@@ -310,99 +1550,886 @@ def extract_footer(footnotes):
     Is found by searching for 'Source'/'Dataset'
     The table footers are then extracted
     '''
-    try:
-        if not footnotes :
-            return [], []
-        footnote = footnotes[0]
-        if "Source" in footnote :
-            i = footnote.find("Source")
-            return footnote[:i] , footnote[i:]
-        if "Dataset" in footnote :
-            i = footnote.find("Dataset")
-            return footnote[:i] , footnote[i:]
-    # Used to check whether the footer is extracted successfully
-    except AttributeError:
-        debug_print("Footer not found")
-        log_file_exceptions.write("Footer not extracted successfully in page " + str(PAGE))
+    return CONVERTER.extract_footer(footnotes, module_document())
 
 # Function to extract the contents of a page
 
-def extract_page_content(page_content):
+def extract_page_content(page_content, tokens=None, page_no=None):
     '''
     This function is used to extract the content of each page
     A dictionary called 'page_details' is initialized
     The respective functions to extract the page header, table title,
     column headers, subjects details, footnotes and footers are called
+    The page tokens are passed from one function to the next along with
+    the position reached in the page, so the page is not searched again
+    The page number is given in 'page_no' when the pages are not extracted in order
+    When the metrics are switched on, the time of each stage and the number of
+    characters of the page it went through are recorded
+    '''
+    global PAGE
+    if METRICS:
+        return extract_page_content_metrics(page_content, tokens, page_no)
+    PAGE = PAGE + 1 if page_no is None else page_no
+    return CONVERTER.extract_page_content(page_content, module_document(), tokens)
+
+def extract_page_members(page_content, page_no=None):
     '''
+    This function extracts the content of a page one part at a time
+    It yields the (key, value) pairs of the page details, with the subject rows
+    read one at a time, as 'RtfConverter.iter_page_members' does
+    '''
+    global PAGE
+    PAGE = PAGE + 1 if page_no is None else page_no
+    return CONVERTER.iter_page_members(page_content, module_document())
+
+def extract_page_content_metrics(page_content, tokens=None, page_no=None):
+    '''
+    This function extracts the content of a page in the same way as 'extract_page_content',
+    recording the metrics of each stage
+    It is kept apart so the extraction costs nothing more when the metrics are switched off
+    '''
+    page_start = start = time.perf_counter()
+    if tokens is None:
+        tokens = tokenize_rtf(page_content)
+        start = record_stage('tokenize_rtf', start, len(page_content))
+    braces = BraceIndex(page_content)
     page_details = {}
-    page_details['header'], page_content = extract_header(page_content)
-    page_details['title'], page_content = extract_title(page_content)
-    page_details['column headers'], page_content = extract_column_headers(page_content)
-    page_details['subjects'], page_content = (
-    extract_table_data(page_content, page_details['column headers'])
+    page_details['header'], position = extract_header(page_content, tokens, page_no, braces)
+    start = record_stage('extract_header', start, position)
+    last_position = position
+    page_details['title'], position = extract_title(page_content, tokens, position, braces)
+    start = record_stage('extract_title', start, position - last_position)
+    last_position = position
+    page_details['column headers'], position = (
+    extract_column_headers(page_content, tokens, position, braces)
     )
-    page_details['footnotes'] = extract_footnotes(page_content)
+    start = record_stage('extract_column_headers', start, position - last_position)
+    last_position = position
+    if CONVERTER.column_types and module_document().typed:
+        page_details['column types'], page_details['subjects'], position = (
+        extract_typed_table(page_content, page_details['column headers'], tokens, position)
+        )
+    else:
+        if CONVERTER.column_types:
+            page_details['column types'] = None
+        page_details['subjects'], position = (
+        extract_table_data(page_content, page_details['column headers'], tokens, position)
+        )
+    start = record_stage('extract_table_data', start, position - last_position)
+    page_details['footnotes'] = extract_footnotes(page_content, position, braces)
+    start = record_stage('extract_footnotes', start, len(page_content) - position)
     page_details['footnotes'], page_details['footer'] = (
     extract_footer(page_details['footnotes'])
     )
+    record_stage('extract_footer', start)
+    record_stage('extract_page_content', page_start, len(page_content))
 
     return page_details
 
+# Function to clean the content of an RTF file
+
+def clean_rtf_content(rtf_bytes):
+    '''This function decodes a part of an RTF file read as bytes
+    The line endings are translated as they are when the file is opened in text mode
+    The '{\\line}' and '\\~' control words are replaced with spaces
+    '''
+    rtf_content = rtf_bytes.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    return rtf_content.replace("{\\line}\n", " ").replace("\\~", " ")
+
+# Function to read the pages of an RTF file one at a time
+
+def read_rtf_pages(rtf_map):
+    '''This function is used to read a memory-mapped RTF file page by page
+    The '\\endnhere' page breaks are found one at a time
+    Only the content of the current page is decoded and cleaned
+    The content before the first page break is not part of any page
+    '''
+    page_start = rtf_map.find(PAGE_BREAK)
+    while page_start != -1:
+        if METRICS:
+            start = time.perf_counter()
+        page_end = rtf_map.find(PAGE_BREAK, page_start + len(PAGE_BREAK))
+        if page_end == -1:
+            page_content = clean_rtf_content(rtf_map[page_start:])
+        else:
+            page_content = clean_rtf_content(rtf_map[page_start:page_end])
+        if METRICS:
+            record_stage('read_rtf_pages', start, len(page_content))
+        yield page_content
+        page_start = page_end
+
+# Function to count the pages of an RTF file
+
+def count_rtf_pages(rtf_map):
+    '''This function counts the '\\endnhere' page breaks of a memory-mapped RTF file'''
+    numpages = 0
+    page_start = rtf_map.find(PAGE_BREAK)
+    while page_start != -1:
+        numpages += 1
+        page_start = rtf_map.find(PAGE_BREAK, page_start + len(PAGE_BREAK))
+    return numpages
+
+# Function to read the content of an RTF file before the first page
+
+def read_rtf_prelude(rtf_map):
+    '''This function is used to read the content before the first page break
+    of a memory-mapped RTF file, which holds the font table
+    '''
+    first_page = rtf_map.find(PAGE_BREAK)
+    if first_page == -1:
+        return clean_rtf_content(rtf_map[:])
+    return clean_rtf_content(rtf_map[:first_page])
+
+# Function to get the path of the JSON file of an RTF file
+
+def get_output_file(item, output_directory):
+    '''This function returns the path of the JSON file that an RTF file is converted to
+    'item' is the path of the RTF file relative to the input folder,
+    so the output directory has the same subfolders as the input folder
+    NDJSON output files are given the '.ndjson' extension
+    When the 'sink' is 'sqlite', every RTF file is converted to the same database
+    '''
+    if OUTPUT_SINK == "sqlite":
+        return os.path.join(output_directory, DATABASE_FILE)
+    extension = ".ndjson" if OUTPUT_FORMAT == "ndjson" else ".json"
+    return os.path.join(
+        output_directory,
+        f"{os.path.splitext(item)[0]}{extension}"
+        )
+
+# Function to extract the pages of an RTF file one at a time
+
+def extract_pages(pages, rows=False):
+    '''This function extracts the content of each page as it is read
+    and yields the page details one page at a time
+    With 'rows' set, each page is yielded as the pairs of 'extract_page_members' instead,
+    so its subject rows are written as they are read
+    '''
+    for page_content in pages:
+        debug_print(f"Processing page {PAGE + 1}")
+        yield extract_page_members(page_content) if rows else extract_page_content(page_content)
+
+# Functions to extract the pages of an RTF file in parallel
+
+def extract_page_batch(file_name, numpages, first_page_no, page_batch):
+    '''This function extracts the content of a batch of consecutive pages
+    It is run in a worker process, so each page is given its page number,
+    counting from 'first_page_no', and the number of pages in the file
+    It returns the page details of the batch, and the metrics of the batch
+    if the metrics are switched on
+    '''
+    global CURRENT_FILE, NUMPAGES, PAGE_TEMPLATES, PAGE_SCHEMAS
+    CURRENT_FILE = file_name
+    NUMPAGES = numpages
+    PAGE_TEMPLATES = {}
+    PAGE_SCHEMAS = {}
+    if METRICS:
+        collect_metrics()
+    page_details = [extract_page_content(page_content, page_no=page_no)
+                    for page_no, page_content in enumerate(page_batch, first_page_no)]
+    return page_details, collect_metrics() if METRICS else None
+
+def extract_pages_parallel(pages, batch_metrics):
+    '''This function extracts the pages of an RTF file in batches of 'page batch' pages,
+    using a pool of 'page workers' processes
+    The page details are yielded in the order of the pages, one page at a time
+    At most two batches per worker are read ahead of the page being written,
+    so a streamed file is still never held in memory at once
+    A file of a single batch is extracted in this process, without starting the pool
+    The metrics of the batches are added to 'batch_metrics'
+    '''
+    pages = iter(pages)
+    page_batch = list(islice(pages, PAGE_BATCH))
+    if len(page_batch) < PAGE_BATCH:
+        for page_no, page_content in enumerate(page_batch, 1):
+            debug_print(f"Processing page {page_no}")
+            yield extract_page_content(page_content, page_no=page_no)
+        return
+
+    with ProcessPoolExecutor(max_workers=PAGE_WORKERS, initializer=init_worker,
+                             initargs=(CONFIG_PATH, CONFIG_OVERRIDES, LOG_QUEUE)) as executor:
+        try:
+            futures = deque()
+            first_page_no = 1
+            while page_batch or futures:
+                while page_batch and len(futures) < 2 * PAGE_WORKERS:
+                    debug_print(f"Processing pages {first_page_no} to "
+                                f"{first_page_no + len(page_batch) - 1}")
+                    futures.append(executor.submit(extract_page_batch, CURRENT_FILE, NUMPAGES,
+                                                   first_page_no, page_batch))
+                    first_page_no += len(page_batch)
+                    page_batch = list(islice(pages, PAGE_BATCH))
+                if METRICS:
+                    start = time.perf_counter()
+                page_details, metrics = futures.popleft().result()
+                if METRICS:
+                    record_stage('extract_page_batches', start)
+                    batch_metrics.append(metrics)
+                yield from page_details
+        finally:
+            # The batches that are not started are dropped if the output cannot be written
+            executor.shutdown(cancel_futures=True)
+
+# Function to merge the consecutive pages of the same table
+
+def same_table(page_details, next_page_details):
+    '''This function checks if two pages are parts of the same table,
+    which have the same title, column headers, footnotes and footer
+    The header, column types and subjects of each page are not compared
+    '''
+    return (page_details.keys() == next_page_details.keys()
+            and all(page_details[key] == next_page_details[key] for key in page_details
+                    if key not in ('header', 'column types', 'subjects')))
+
+def stitch_pages(pages):
+    '''This function merges the consecutive pages of the same table into one table
+    Each table is yielded as the (key, value) pairs of its details, in the same way as
+    'extract_page_members' yields a page:
+    - the title, column headers, footnotes and footer, which are the same on each page,
+      are given once
+    - 'subjects' gives the rows of all the pages of the table one page at a time
+    - 'pages' is the page boundary index: the number, header, first row and number of
+      rows of each page, counting the rows of the table from 0
+    The pages of a table are read one at a time, so only a single page is held,
+    and the 'pages' index is only complete once the subjects are read
+    When the 'column types' of the pages are None, the pages were not typed one by one,
+    and the rows of the whole table are read to find the column types of the table
+    with 'type_columns', so a column has the same type on all the pages of a table
+    '''
+    pages = iter(pages)
+    page = next(pages, None)
+    page_no = 1
+    while page is not None:
+        table_page = page
+        page_index = []
+
+        def table_rows():
+            nonlocal page, page_no
+            row_count = 0
+            while True:
+                rows = page['subjects']
+                page_index.append({'page': page_no, 'header': page['header'],
+                                   'first row': row_count, 'rows': len(rows)})
+                row_count += len(rows)
+                yield from rows
+                page = next(pages, None)
+                page_no += 1
+                if page is None or not same_table(table_page, page):
+                    return
+
+        def table_members():
+            subjects = table_rows()
+            for key, value in table_page.items():
+                if key == 'column types' and value is None:
+                    column_headers = table_page['column headers']
+                    value, rows = type_columns(len(column_headers),
+                                               [tuple(row.values()) for row in subjects])
+                    subjects = (dict(zip(column_headers, row)) for row in rows)
+                if key == 'subjects':
+                    yield key, subjects
+                elif key != 'header':
+                    yield key, value
+            yield 'pages', page_index
+
+        yield table_members()
+
+# Function to write the JSON output of an RTF file
+
+def format_output_start(fonts, output_format, data_key='data'):
+    '''This function returns the start of the JSON output, up to the first page
+    The pages, or tables, are written in a list under 'data_key'
+    '''
+    if output_format == "ndjson":
+        return json.dumps({'fonts': fonts}, separators=(',', ':')) + "\n"
+    if output_format == "compact":
+        return ('{"fonts":' + json.dumps(fonts, separators=(',', ':')) + ','
+                + json.dumps(data_key) + ':[')
+    # Nested values are indented by replacing the line breaks of json.dumps,
+    # which never appear inside JSON strings
+    return ('{\n    "fonts": ' + json.dumps(fonts, indent=4).replace('\n', '\n    ')
+            + ',\n    ' + json.dumps(data_key) + ': [')
+
+def format_output_page(page_details, page_index, output_format):
+    '''This function returns the JSON output of a page, 'page_index' counting from 0
+    The subject rows are written the same way whether they are a list or a 'SubjectTable'
+    '''
+    if output_format == "ndjson":
+        return json.dumps(page_details, separators=(',', ':'), default=json_default) + "\n"
+    if output_format == "compact":
+        return (',' if page_index else '') + json.dumps(page_details, separators=(',', ':'),
+                                                        default=json_default)
+    return ((',\n        ' if page_index else '\n        ')
+            + json.dumps(page_details, indent=4, default=json_default)
+            .replace('\n', '\n        '))
+
+def format_output_members(members, page_index, output_format):
+    '''This function yields the JSON output of a page a part at a time,
+    the same output 'format_output_page' returns for the whole page details
+    The page is given as the (key, value) pairs of its page details, and the rows of
+    the 'subjects' iterator are written 'ROW_BATCH' rows at a time
+    '''
+    if output_format == "pretty":
+        indent = '\n            '
+        yield (',\n        {' if page_index else '\n        {')
+    else:
+        indent = None
+        yield (',{' if page_index and output_format == "compact" else '{')
+    for member_no, (key, value) in enumerate(members):
+        separator = ',' if member_no else ''
+        if indent is None:
+            yield separator + json.dumps(key) + ':'
+        else:
+            yield separator + indent + json.dumps(key) + ': '
+        if key != 'subjects':
+            yield (json.dumps(value, separators=(',', ':')) if indent is None
+                   else json.dumps(value, indent=4).replace('\n', indent))
+            continue
+        # The rows are encoded a few at a time, as each call of the encoder has a set-up cost
+        separator = '['
+        rows = iter(value)
+        row_batch = list(islice(rows, ROW_BATCH))
+        while row_batch:
+            if indent is None:
+                yield separator + COMPACT_ENCODER.encode(row_batch)[1:-1]
+            else:
+                yield separator + PRETTY_ENCODER.encode(row_batch)[1:-2].replace('\n', indent)
+            separator = ','
+            row_batch = list(islice(rows, ROW_BATCH))
+        if separator == '[':
+            yield '[]'
+        else:
+            yield ']' if indent is None else indent + ']'
+    if output_format == "pretty":
+        yield '\n        }'
+    else:
+        yield '}\n' if output_format == "ndjson" else '}'
+
+def format_output_end(page_count, output_format):
+    '''This function returns the end of the JSON output, after the last page'''
+    if output_format == "ndjson":
+        return ""
+    if output_format == "compact":
+        return ']}'
+    return '\n    ]\n}' if page_count else ']\n}'
+
+def write_json_output(output_file, fonts, pages, output_format=None, layout=None):
+    '''This function writes the fonts and pages of an RTF file to the output file
+    The pages are written as they are produced, so they are never all held in memory
+    A page is given as its page details, or as the pairs yielded by 'extract_page_members'
+    The output format is given, or else set by 'format' in the OUTPUT section of the config file:
+    - 'pretty' is the same as json.dump with an indent of 4
+    - 'compact' is the same JSON without any whitespace
+    - 'ndjson' writes the fonts on the first line and one page object per line after it
+    The layout is given, or else set by 'layout' in the OUTPUT section of the config file:
+    - 'pages' writes the pages in a 'data' list
+    - 'tables' writes the tables made by 'stitch_pages' in a 'tables' list,
+      and needs the pages to be given as page details
+    The file is written under a temporary name, so a failed conversion leaves no partial file
+    '''
+    output_format = output_format or OUTPUT_FORMAT
+    layout = layout or OUTPUT_LAYOUT
+    data_key = 'data'
+    if layout == "tables":
+        pages = stitch_pages(pages)
+        data_key = 'tables'
+    temp_file = output_file + ".tmp"
+    try:
+        with open(temp_file, 'w', encoding = "utf-8") as f:
+            f.write(format_output_start(fonts, output_format, data_key))
+            page_count = 0
+            for page_count, page_details in enumerate(pages, 1):
+                if isinstance(page_details, dict):
+                    f.write(format_output_page(page_details, page_count - 1, output_format))
+                else:
+                    # The page is given by 'extract_page_members', or the table by
+                    # 'stitch_pages', and written as it is read
+                    f.writelines(format_output_members(page_details, page_count - 1,
+                                                       output_format))
+            f.write(format_output_end(page_count, output_format))
+    except BaseException:
+        os.remove(temp_file)
+        raise
+    os.replace(temp_file, output_file)
+
+# Function to get the path of the subject table file of an RTF file
+
+def get_table_file(item, output_directory):
+    '''This function returns the path of the file that the subject table data
+    of an RTF file is written to, in the 'tables' format of the config file
+    'item' is the path of the RTF file relative to the input folder, as in 'get_output_file'
+    '''
+    extension = {"columnar": ".columns.json", "csv": ".csv", "sqlite": ".sqlite"}[TABLE_FORMAT]
+    return os.path.join(
+        output_directory,
+        f"{os.path.splitext(item)[0]}{extension}"
+        )
+
+# Function to collect the subject table data of the pages in columns
+
+def collect_table_columns(pages, table_columns):
+    '''This function collects the subject rows of each page in columns as the pages pass
+    'table_columns' is filled with a 'page' list giving the page number of each row,
+    and a 'columns' dictionary with one list per column header, in the order they are found
+    A row without a value for a column is given None
+    The page details are yielded unchanged
+    '''
+    page_numbers = table_columns['page'] = []
+    columns = table_columns['columns'] = {}
+    for page_no, page_details in enumerate(pages, 1):
+        for subject_details in page_details['subjects']:
+            for column_header, value in subject_details.items():
+                column = columns.get(column_header)
+                if column is None:
+                    column = columns[column_header] = [None] * len(page_numbers)
+                column.append(value)
+            page_numbers.append(page_no)
+            for column in columns.values():
+                if len(column) < len(page_numbers):
+                    column.append(None)
+        yield page_details
+
+# Function to give the columns of the subject table file unique names
+
+def unique_column_names(names):
+    '''This function returns the column names with a number added to each name that is
+    already used, such as 'Page (2)' after 'page', ignoring case as SQLite does
+    '''
+    used = set()
+    unique_names = []
+    for name in names:
+        unique_name = name
+        number = 1
+        while unique_name.casefold() in used:
+            number += 1
+            unique_name = f"{name} ({number})"
+        used.add(unique_name.casefold())
+        unique_names.append(unique_name)
+    return unique_names
+
+# Function to write the subject table data of an RTF file
+
+def write_table_output(table_file, table_columns):
+    '''This function writes the subject table data collected in columns
+    The format is set by 'tables' in the OUTPUT section of the config file:
+    - 'columnar' writes a JSON object with the column headers and one array per column
+    - 'csv' writes a CSV file with a 'page' column followed by one column per column header
+    - 'sqlite' writes a SQLite database with the same columns in a 'subjects' table
+    In the CSV file and the database, a column header that is the same as 'page', or as
+    another column header apart from its case, is given a number by 'unique_column_names'
+    The file is written under a temporary name and moved into place when it is complete
+    '''
+    column_headers = list(table_columns['columns'])
+    temp_file = table_file + ".tmp"
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+    try:
+        if TABLE_FORMAT == "columnar":
+            with open(temp_file, 'w', encoding = "utf-8") as f:
+                json.dump({'column headers': column_headers, 'page': table_columns['page'],
+                           'columns': table_columns['columns']},
+                          f, separators=(',', ':'))
+        else:
+            rows = zip(table_columns['page'], *table_columns['columns'].values())
+            if CONVERTER.column_types:
+                # The pairs of 'count (percent)' and 'mean (sd)' columns are written as JSON
+                rows = ([json.dumps(value) if isinstance(value, dict) else value
+                         for value in row] for row in rows)
+            if TABLE_FORMAT == "csv":
+                with open(temp_file, 'w', encoding = "utf-8", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(unique_column_names(['page'] + column_headers))
+                    writer.writerows(rows)
+            else:
+                names = ", ".join('"' + h.replace('"', '""') + '"'
+                                  for h in unique_column_names(['page'] + column_headers))
+                values = ", ".join('?' * (len(column_headers) + 1))
+                connection = sqlite3.connect(temp_file)
+                try:
+                    with connection:
+                        connection.execute(f"CREATE TABLE subjects ({names})")
+                        connection.executemany(f"INSERT INTO subjects VALUES ({values})", rows)
+                finally:
+                    connection.close()
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    os.replace(temp_file, table_file)
+
+# Function to write the pages of an RTF file to the SQLite database
+
+def write_database_output(database_file, name, fonts, pages):
+    '''This function writes the fonts and pages of an RTF file to the SQLite database,
+    which is made with the tables of 'DATABASE_SCHEMA' if it does not exist
+    - 'documents' has the name, page count and fonts of each RTF file
+    - 'pages' has the header, column headers, column types and footer of each page
+    - 'titles' has one row per title line, and 'footnotes' one row per page
+    - 'subjects' has one row per cell of the subject rows, with its column header,
+      so the tables with different column headers share it
+    The headers, column headers, fonts and the values of typed pairs of columns
+    are written as JSON
+    The rows are first staged in a temporary database of the worker process as the pages
+    pass, with 'executemany' each time DATABASE_BATCH subject cells are collected,
+    so only one batch of rows is held at a time and the pages are extracted
+    without holding the lock of the database
+    They are then copied into the database in a single transaction, which first deletes
+    the rows of an earlier conversion of the file
+    The database is in WAL mode, so it can be read while it is written, and the worker
+    processes take turns writing, waiting up to DATABASE_TIMEOUT seconds for each other
+    '''
+    staging_file = f"{database_file}.{os.getpid()}.tmp"
+    if os.path.exists(staging_file):
+        os.remove(staging_file)
+    try:
+        page_count = stage_database_rows(staging_file, pages)
+        connection = sqlite3.connect(database_file, timeout=DATABASE_TIMEOUT,
+                                     isolation_level="IMMEDIATE")
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(DATABASE_SCHEMA + DATABASE_INDEXES)
+            connection.execute("ATTACH DATABASE ? AS staged", (staging_file,))
+            with connection:
+                for table in ("pages", "titles", "footnotes", "subjects"):
+                    connection.execute(f"DELETE FROM {table} WHERE document IN "
+                                       "(SELECT id FROM documents WHERE name = ?)", (name,))
+                connection.execute("DELETE FROM documents WHERE name = ?", (name,))
+                document_id = connection.execute(
+                    "INSERT INTO documents (name, pages, fonts) VALUES (?, ?, ?)",
+                    (name, page_count, json.dumps(fonts))).lastrowid
+                connection.execute(
+                    "INSERT INTO pages SELECT ?, page, header, column_headers, column_types, "
+                    "footer FROM staged.pages", (document_id,))
+                connection.execute("INSERT INTO titles SELECT ?, page, line, title "
+                                   "FROM staged.titles", (document_id,))
+                connection.execute("INSERT INTO footnotes SELECT ?, page, footnote "
+                                   "FROM staged.footnotes", (document_id,))
+                connection.execute("INSERT INTO subjects SELECT ?, page, row_no, column_name, "
+                                   "value FROM staged.subjects", (document_id,))
+            connection.execute("DETACH DATABASE staged")
+        finally:
+            connection.close()
+    finally:
+        if os.path.exists(staging_file):
+            os.remove(staging_file)
+
+def stage_database_rows(staging_file, pages):
+    '''This function writes the rows of the pages of an RTF file to a new SQLite file,
+    with the tables of 'DATABASE_SCHEMA' and the document left as 0
+    It returns the number of pages
+    '''
+    connection = sqlite3.connect(staging_file)
+    try:
+        # The file is deleted once it is copied, so it is never synced
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.executescript(DATABASE_SCHEMA)
+        with connection:
+            page_rows = []
+            title_rows = []
+            footnote_rows = []
+            subject_rows = []
+
+            def insert_rows():
+                connection.executemany("INSERT INTO pages VALUES (0, ?, ?, ?, ?, ?)", page_rows)
+                connection.executemany("INSERT INTO titles VALUES (0, ?, ?, ?)", title_rows)
+                connection.executemany("INSERT INTO footnotes VALUES (0, ?, ?)", footnote_rows)
+                connection.executemany("INSERT INTO subjects VALUES (0, ?, ?, ?, ?)",
+                                       subject_rows)
+                for rows in (page_rows, title_rows, footnote_rows, subject_rows):
+                    rows.clear()
+
+            page_count = 0
+            for page_count, page_details in enumerate(pages, 1):
+                column_types = page_details.get('column types')
+                page_rows.append((page_count, json.dumps(page_details['header']),
+                                  json.dumps(page_details['column headers']),
+                                  json.dumps(column_types) if column_types is not None
+                                  else None,
+                                  page_details['footer'] or None))
+                title_rows.extend((page_count, line, title)
+                                  for line, title in enumerate(page_details['title'], 1))
+                footnote_rows.append((page_count, page_details['footnotes'] or None))
+                for row_no, subject_details in enumerate(page_details['subjects'], 1):
+                    subject_rows.extend(
+                        (page_count, row_no, column_header,
+                         json.dumps(value) if isinstance(value, dict) else value)
+                        for column_header, value in subject_details.items())
+                if len(subject_rows) >= DATABASE_BATCH:
+                    insert_rows()
+            insert_rows()
+    finally:
+        connection.close()
+    return page_count
+
+# Functions to keep the inverted index of the titles, headers and footnotes
+
+def get_index_file(output_directory):
+    '''This function returns the path of the index of an output directory'''
+    return os.path.join(output_directory, INDEX_FILE)
+
+def add_index_tokens(postings, page_no, key, value):
+    '''This function adds the words of a page detail to the postings of a file,
+    as (word, page, field) postings, if the detail is one of the INDEX_FIELDS
+    The words are lowercased, and each is only added once per page and field
+    '''
+    field = INDEX_FIELDS.get(key)
+    if field is not None:
+        # The title is a list of lines and the header a dictionary of lines
+        text = value if isinstance(value, str) else " ".join(value)
+        postings.update((token, page_no, field)
+                        for token in INDEX_TOKEN_PATTERN.findall(text.lower()))
+
+def index_page_members(members, page_no, postings):
+    '''This function adds the words of a page given by 'extract_page_members' to the
+    postings as the pairs pass, so the subject rows are still written as they are read
+    '''
+    for key, value in members:
+        add_index_tokens(postings, page_no, key, value)
+        yield key, value
+
+def collect_index_tokens(pages, postings):
+    '''This function adds the words of the titles, headers and footnotes of each page
+    to the 'postings' set as the pages pass
+    The pages are yielded unchanged
+    '''
+    for page_no, page_details in enumerate(pages, 1):
+        if isinstance(page_details, dict):
+            for key, value in page_details.items():
+                add_index_tokens(postings, page_no, key, value)
+            yield page_details
+        else:
+            yield index_page_members(page_details, page_no, postings)
+
+def connect_index(index_file):
+    '''This function opens the index, and makes its tables if it is new
+    The index is in WAL mode so it can be queried while the worker processes update it
+    '''
+    connection = sqlite3.connect(index_file, timeout=DATABASE_TIMEOUT,
+                                 isolation_level="IMMEDIATE")
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(INDEX_SCHEMA)
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+def update_index(index_file, name, postings):
+    '''This function replaces the postings of a file in the index with its new postings,
+    in a single transaction, so the index is updated as each file is converted
+    '''
+    connection = connect_index(index_file)
+    try:
+        with connection:
+            connection.execute("INSERT OR IGNORE INTO files (name) VALUES (?)", (name,))
+            file_id = connection.execute("SELECT id FROM files WHERE name = ?",
+                                         (name,)).fetchone()[0]
+            connection.execute("DELETE FROM postings WHERE file = ?", (file_id,))
+            connection.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                                   ((token, file_id, page_no, field)
+                                    for token, page_no, field in postings))
+    finally:
+        connection.close()
+
+def query_index(output_directory, text, field=None):
+    '''This function finds the pages that have all the words of 'text'
+    in their titles, headers or footnotes, or only in the given field
+    The pages of the rarest word are read, and each is kept if the other words are found
+    on the same page through the primary key, so common words are never read in full
+    It returns the sorted list of (file, page) pairs, which is empty if there is no index
+    '''
+    tokens = set(INDEX_TOKEN_PATTERN.findall(text.lower()))
+    index_file = get_index_file(output_directory)
+    if not tokens or not os.path.isfile(index_file):
+        return []
+    field_condition = " AND {0}.field = ?" if field is not None else ""
+    field_parameters = [field] if field is not None else []
+    connection = sqlite3.connect(index_file)
+    try:
+        tokens = sorted(tokens, key=lambda token: connection.execute(
+            "SELECT COUNT(*) FROM postings AS p WHERE p.token = ?"
+            + field_condition.format("p"), [token] + field_parameters).fetchone()[0])
+        query = ("SELECT DISTINCT p.file, p.page FROM postings AS p WHERE p.token = ?"
+                 + field_condition.format("p"))
+        parameters = [tokens[0]] + field_parameters
+        for token in tokens[1:]:
+            query += (" AND EXISTS (SELECT 1 FROM postings AS o WHERE o.token = ?"
+                      " AND o.file = p.file AND o.page = p.page"
+                      + field_condition.format("o") + ")")
+            parameters += [token] + field_parameters
+        return connection.execute(
+            f"SELECT files.name, m.page FROM ({query}) AS m JOIN files ON files.id = m.file "
+            "ORDER BY files.name, m.page", parameters).fetchall()
+    finally:
+        connection.close()
+
 # Function to convert an rtf file to json
 
-def convert_rtf(item, file_no, output_directory):
+def convert_rtf(item, file_no, output_directory, stream=None, check=False, name=None,
+                content_hash=None):
     '''
     This function is used to convert the RTF file into JSON format
     The page breaks function is called to split the content for each page
+    Files of at least 'stream size mb' MB are memory-mapped and read one page at a time,
+    so that the whole file is never held in memory as a string
+    When 'check' is set, the schema of the file is checked on the content read for
+    the conversion, so the file is only read once
+    The pages are written to the output file one at a time, in the 'format' of the config file,
+    or to the SQLite database of the output directory when the 'sink' is 'sqlite',
+    which has one row per page whatever the 'layout'
+    The subject table data is also written in the 'tables' format, if one is set
+    The words of the titles, headers and footnotes are added to the index, if it is switched on
+    When the metrics are switched on, the time of reading, checking, extracting
+    and writing the file is recorded
+    The pages are counted before they are extracted, for the NUMPAGES field of the headers
+    The file is named by its path relative to the input folder, given in 'name',
+    or else by its file name, in the output directory, the logs, the database and the index
+    When a hashlib object is given in 'content_hash', it is updated with the bytes of the file
+    as they are read for the conversion, so the file does not have to be read again to hash it
     '''
+    global PAGE, NUMPAGES, CURRENT_FILE, PAGE_TEMPLATES, PAGE_SCHEMAS
     debug_print(f"Converting file {file_no}: {item}")
+    CURRENT_FILE = name or os.path.basename(item)
+    PAGE_TEMPLATES = {}
+    PAGE_SCHEMAS = {}
+    convert_start = time.perf_counter()
     # output_log = open('/Users/shreejakatama/Downloads/Internship/Folder Code/Output_log.txt','a')
+    file_size = os.path.getsize(item)
+    if stream is None:
+        stream = 0 < STREAM_SIZE <= file_size
+    if METRICS:
+        start = convert_start
     try:
-      # Extract rtf content as a string in python
-        with open(item, 'r', encoding = "utf-8") as file:
-            rtf_content = file.read().replace("{\\line}\n", " ").replace("\\~", " ")
-            debug_print(f"RTF content loaded for file {file_no}")
-
-        fonts = extract_font_details(rtf_content)
-        # debug_print(f"Fonts extracted: {fonts}")
-
-        json_dictionary = {}
-        data = []
-        json_dictionary ['fonts'] = fonts
-        json_dictionary ['data'] = data
-
-        page_breaks = extract_page_breaks(rtf_content)
-        debug_print(f"Page breaks found: {page_breaks}")
-
-        PAGE = 0
-        NUMPAGES = rtf_content.count("NUMPAGES")
-        for i in range(len(page_breaks)-1) :
-
-            page_content = rtf_content[page_breaks[i] : page_breaks[i+1]]
-            debug_print(f"Processing page {PAGE + 1}")
-            page_details = extract_page_content(page_content)
-            data.append(page_details)
-        output_file = os.path.join(
-            output_directory,
-            f"{os.path.splitext(os.path.basename(item))[0]}.json"
-            )
-
-        with open(output_file, 'w', encoding = "utf-8") as f:
-            json.dump(json_dictionary , f, indent=4)
-        debug_print(f"JSON file {output_file} successfully created")
-        log_file_success.write(f"Data successfully written to {output_file}\n")
+        with ExitStack() as stack:
+            if stream:
+                with open(item, 'rb') as file:
+                    rtf_map = stack.enter_context(
+                        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+                if content_hash is not None:
+                    content_hash.update(rtf_map)
+                debug_print(f"RTF content mapped for file {file_no}")
+                if METRICS:
+                    start = record_stage('read_rtf', start, file_size)
+                if check:
+                    if not check_rtf(item, rtf_map):
+                        return reject_rtf(item)
+                    if METRICS:
+                        start = record_stage('check_rtf', start, file_size)
+                prelude = read_rtf_prelude(rtf_map)
+                fonts = extract_font_details(prelude)
+                if METRICS:
+                    start = record_stage('extract_font_details', start, len(prelude))
+                NUMPAGES = count_rtf_pages(rtf_map)
+                pages = read_rtf_pages(rtf_map)
+            else:
+              # Extract rtf content as a string in python
+                with open(item, 'rb') as file:
+                    rtf_bytes = file.read()
+                if content_hash is not None:
+                    content_hash.update(rtf_bytes)
+                rtf_content = clean_rtf_content(rtf_bytes)
+                del rtf_bytes
+                debug_print(f"RTF content loaded for file {file_no}")
+                if METRICS:
+                    start = record_stage('read_rtf', start, file_size)
+                if check:
+                    if not check_rtf(item, rtf_content):
+                        return reject_rtf(item)
+                    if METRICS:
+                        start = record_stage('check_rtf', start, len(rtf_content))
+
+                fonts = extract_font_details(rtf_content)
+                # debug_print(f"Fonts extracted: {fonts}")
+                if METRICS:
+                    start = record_stage('extract_font_details', start, len(rtf_content))
+
+                page_breaks = extract_page_breaks(rtf_content)
+                debug_print(f"Page breaks found: {page_breaks}")
+                if METRICS:
+                    start = record_stage('extract_page_breaks', start, len(rtf_content))
+                NUMPAGES = len(page_breaks) - 1
+                pages = (rtf_content[page_breaks[i] : page_breaks[i+1]]
+                         for i in range(NUMPAGES))
+
+            if check:
+                debug_print("RTF File conforms to schema")
+
+            # The page count is reset so every file is numbered from its first page
+            PAGE = 0
+            output_file = get_output_file(CURRENT_FILE, output_directory)
+            # The output of a file in a subfolder is written to the same subfolder
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            batch_metrics = []
+            if PAGE_WORKERS > 1:
+                pages = extract_pages_parallel(pages, batch_metrics)
+            else:
+                # The rows are only written as they are read when no other
+                # output needs the page details
+                pages = extract_pages(pages, rows=TABLE_FORMAT == "none" and not METRICS
+                                      and OUTPUT_LAYOUT == "pages" and OUTPUT_SINK == "json")
+            if TABLE_FORMAT != "none":
+                table_columns = {}
+                pages = collect_table_columns(pages, table_columns)
+            if INDEX:
+                postings = set()
+                pages = collect_index_tokens(pages, postings)
+            # Each page is written as soon as it is extracted
+            if METRICS:
+                # The pages are read and extracted while they are written,
+                # so that time is taken off the time of writing the output file
+                start = time.perf_counter()
+                page_seconds = sum(stage_seconds(stage) for stage in PAGE_STAGES)
+            if OUTPUT_SINK == "sqlite":
+                write_database_output(output_file, CURRENT_FILE, fonts, pages)
+            else:
+                write_json_output(output_file, fonts, pages)
+            if METRICS:
+                page_seconds = sum(stage_seconds(stage) for stage in PAGE_STAGES) - page_seconds
+                start = record_stage('write_database_output' if OUTPUT_SINK == "sqlite"
+                                     else 'write_json_output', start + page_seconds,
+                                     os.path.getsize(output_file))
+                # The pages extracted by the worker processes are counted once written
+                for metrics in batch_metrics:
+                    merge_metrics(metrics)
+            if TABLE_FORMAT != "none":
+                table_file = get_table_file(CURRENT_FILE, output_directory)
+                write_table_output(table_file, table_columns)
+                if METRICS:
+                    start = record_stage('write_table_output', start,
+                                         os.path.getsize(table_file))
+            if INDEX:
+                update_index(get_index_file(output_directory), CURRENT_FILE, postings)
+                if METRICS:
+                    record_stage('update_index', start, len(postings))
+        if METRICS:
+            record_stage('convert_rtf', convert_start, file_size)
+        debug_print(f"Output {output_file} successfully written")
+        log_success(f"Data successfully written to {output_file}\n", stage="convert_rtf",
+                    duration=round(time.perf_counter() - convert_start, 6))
 
         return "Successful", ""
-    except AttributeError as e:
+    # A row with more cells than column headers raises an IndexError
+    except (AttributeError, IndexError) as e:
         debug_print("Error, cannot be converted due to " + str(e))
-        log_file_exceptions.write(item+" cannot be converted due to "+ "\n")
+        log_exception(item+" cannot be converted due to "+ "\n", stage="convert_rtf",
+                      duration=round(time.perf_counter() - convert_start, 6))
         return "Failed", "Not in Scope"
+    except (OSError, sqlite3.Error) as e:
+        # An output that cannot be written fails this file only, not the whole folder
+        debug_print("Error, output cannot be written due to " + str(e))
+        log_exception(item+" output cannot be written due to "+ str(e) + "\n",
+                      stage="convert_rtf",
+                      duration=round(time.perf_counter() - convert_start, 6))
+        return "Failed", "Output not written"
 
 def upload_folder():
     '''
     This is a function to get the folder from the user
     This function uses the UI to accept and upload the folder
     '''
+    from tkinter import filedialog
     folder_selected = filedialog.askdirectory()
     if folder_selected:
         FOLDER_PATH.set(folder_selected)
@@ -410,63 +2437,740 @@ def upload_folder():
         SELECTED_FOLDER_PATH = folder_selected
         process_files(folder_selected)
 
-def process_files(selected_folder):
+# Functions to read and write the manifest of the output directory
+
+def load_manifest(output_directory):
+    '''
+    This function reads the manifest of the output directory
+    The manifest maps each RTF file to the content hash, size, modification time
+    and config fingerprint it was last converted with
+    An empty manifest is returned if there is none or it cannot be read
+    '''
+    try:
+        with open(os.path.join(output_directory, MANIFEST_FILE), 'r', encoding = "utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        debug_print("No manifest found")
+        return {}
+
+def save_manifest(output_directory, manifest):
+    '''
+    This function writes the manifest of the output directory
+    It is written to a temporary file first, so an interrupted run leaves the old manifest
     '''
-    This function is used to process the files in the folder
-    It creates an output directory in the parent folder
-    It iterates through the folder
+    manifest_file = os.path.join(output_directory, MANIFEST_FILE)
+    with open(manifest_file + ".tmp", 'w', encoding = "utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+def hash_file(file_path):
+    '''This function returns the SHA-256 hash of the content of a file'''
+    content_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+def check_cache(file_path, entry, output_directory, name=None, file_stat=None):
+    '''
+    This function compares an RTF file with its entry in the manifest
+    The file is named by its path relative to the input folder, or else by its file name,
+    and its os.stat result can be given when it is already known
+    It returns whether the file has the same size, modification time and config
+    as in the manifest, so it can be reported as "Cached" without being read,
+    and the content hash to compare the file with when it may have changed
+    '''
+    name = name or os.path.basename(file_path)
+    if (entry and entry.get("config") == CONFIG_FINGERPRINT
+            and os.path.isfile(get_output_file(name, output_directory))
+            and (TABLE_FORMAT == "none"
+                 or os.path.isfile(get_table_file(name, output_directory)))
+            and (not INDEX or os.path.isfile(get_index_file(output_directory)))):
+        if file_stat is None:
+            file_stat = os.stat(file_path)
+        if (entry.get("size") == file_stat.st_size
+                and entry.get("mtime") == file_stat.st_mtime_ns):
+            return True, None
+        # The content hash decides whether a touched file has changed
+        return False, entry.get("hash")
+    return False, None
+
+def process_file(file_path, file_no, output_directory, cache=False, cached_hash=None,
+                 name=None):
+    '''
+    This function is used to process a single RTF file
+    The file is converted to JSON if it adheres to the schema
+    The file is named by its path relative to the input folder, given in 'name',
+    or else by its file name
+    When the cache is used and the file was converted before, the content hash of the file
+    is compared with the hash of its last conversion, and the file is not converted again
+    if it is unchanged
+    Otherwise the file is hashed as it is read for the conversion, so it is only read once
+    It returns the status and remarks of the file, its new manifest entry
+    (None if the file was not converted successfully or the cache is not used)
+    and the metrics of its conversion (None if the metrics are switched off or
+    the file was not converted)
+    This function is run in a worker process when the folder is processed in parallel
+    '''
+    entry = metrics = None
+    if METRICS:
+        collect_metrics()
+    if cache:
+        file_stat = os.stat(file_path)
+        entry = {"hash": None, "size": file_stat.st_size,
+                 "mtime": file_stat.st_mtime_ns, "config": CONFIG_FINGERPRINT}
+        if cached_hash is not None:
+            # A touched file is only converted again if its content has changed
+            entry["hash"] = hash_file(file_path)
+    if cached_hash is not None and entry is not None and entry["hash"] == cached_hash:
+        status, remarks = "Cached", "Unchanged since the last conversion"
+        debug_print("RTF File unchanged")
+    else:
+        content_hash = (hashlib.sha256()
+                        if entry is not None and entry["hash"] is None else None)
+        status, remarks = convert_rtf(file_path, file_no, output_directory, check=True,
+                                      name=name, content_hash=content_hash)
+        if content_hash is not None:
+            entry["hash"] = content_hash.hexdigest()
+        debug_print("RTF File processed")
+        if status != "Successful":
+            entry = None
+        if METRICS:
+            metrics = collect_metrics()
+    # The log records of the file are written before the next file is started
+    flush_log_files()
+    return status, remarks, entry, metrics
+
+def discover_files(folder, skip_directory=None, prefix=""):
+    '''
+    This function walks a folder and its subfolders with os.scandir
+    It yields the path of each file relative to the folder, its path, and its os.stat result,
+    which is None for the entries that are not files
+    The subfolders are walked where they are found, and 'skip_directory' is not walked,
+    nor are the links to folders, so a folder is never walked twice
+    '''
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            name = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if skip_directory is None or os.path.realpath(entry.path) != skip_directory:
+                    yield from discover_files(entry.path, skip_directory, name + os.sep)
+            elif entry.is_file():
+                yield name, entry.path, entry.stat()
+            else:
+                yield name, entry.path, None
+
+def process_files(selected_folder, workers=None, output_directory=None, cache=None):
+    '''
+    This function is used to process the files in the folder and its subfolders
+    It creates an output directory in the parent folder, unless another one is given,
+    with the same subfolders as the folder
+    It walks through the folder with 'discover_files', which finds the size of each file
     It checks if the file is an RTF file
-    If the file is an RTF file, the schema of the file is checked
-    If the file adheres to the schema, the file is converted to JSON
+    If the file is an RTF file, it is processed using the 'process_file' function
+    Each file is named by its path relative to the folder, in the results and the manifest
+    When the cache is used, RTF files with the same size, modification time and config
+    as in the manifest are reported as "Cached" without being read
+    When more than one worker is used, the RTF files are sent to a pool of processes,
+    largest first, so a large file found last does not leave the other workers idle
+    The results are shown in the folder order, as they would be when processed one by one
+    It returns the list of (file, status, remarks, metrics summary) results
+    When the metrics are switched on, they are written to a metrics file in the output
+    directory, and the summary of each converted file is shown in the results table
+    The results table is only filled when the User Interface is running
     '''
     global OUTPUT_DIRECTORY, FOLDER_TO_DELETE  # Declare as global variables
-    for row in table.get_children():
-        table.delete(row)
+    if table:
+        for row in table.get_children():
+            table.delete(row)
 
     if not selected_folder:
-        return
-
-    files = os.listdir(selected_folder)
-    OUTPUT_DIRECTORY = os.path.join(selected_folder, 'Output')
+        return []
+
+    run_start = time.perf_counter()
+    if workers is None:
+        workers = WORKERS
+    if cache is None:
+        cache = CACHE
+    OUTPUT_DIRECTORY = output_directory or os.path.join(selected_folder, 'Output')
     FOLDER_TO_DELETE = OUTPUT_DIRECTORY  # Assign the output directory to FOLDER_TO_DELETE
     os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
-    print('{OUTPUT_DIRECTORY} successfully created')
+    debug_print(f"{OUTPUT_DIRECTORY} successfully created")
+    manifest = load_manifest(OUTPUT_DIRECTORY) if cache else {}
+    new_manifest = {}
+    file_metrics = {}
+    results = []
+    rtf_files = []
     file_no = 0
-    for file in files:
-        file_path = os.path.join(selected_folder, file)
+    # The output directory is left out when it is inside the folder
+    for file, file_path, file_stat in discover_files(selected_folder,
+                                                     os.path.realpath(OUTPUT_DIRECTORY)):
         if not file.endswith('.rtf'):
             status = "Failed"
             remarks = "Choose a RTF File"
-            color = 'red'
             debug_print("Not an RTF File, cannot be converted")
-        elif os.path.isfile(file_path):
+        elif file_stat is not None:
             file_no += 1
-            if check_rtf(file_path):
-                print("RTF File conforms to schema")
-                status, remarks = convert_rtf(file_path, file_no, OUTPUT_DIRECTORY)
-                color = 'green' if status == "Successful" else 'red'
-                debug_print("RTF File converted successfully")
-            else:
-                print(f"RTF File {file} does not conform to schema, cannot be converted")
-                log_file_exceptions.write(
-                    f"RTF File {file} does not conform to schema, "
-                    "cannot be converted\n"
-                    )
-
-                status = "Failed"
-                remarks = "No remarks Found"
-                color = 'red'
+            status = remarks = None
+            entry = manifest.get(file)
+            cached, cached_hash = check_cache(file_path, entry, OUTPUT_DIRECTORY, file,
+                                              file_stat)
+            if cached:
+                status, remarks = "Cached", "Unchanged since the last conversion"
+                new_manifest[file] = entry
+            if status is None:
+                rtf_files.append((len(results), file_path, file_no, cached_hash,
+                                  file_stat.st_size))
         else:
             status = "Failed"
             remarks = "No remarks Found"
-            color = 'red'
+        results.append((file, status, remarks, ""))
+
+    if workers > 1 and len(rtf_files) > 1:
+        # The worker processes send their log records to the log queue of this process
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(CONFIG_PATH, CONFIG_OVERRIDES,
+                                           LOG_QUEUE)) as executor:
+            # The largest files are started first, and each worker takes the next largest
+            # file when it is done, so the files end at about the same time
+            futures = {
+                executor.submit(process_file, file_path, file_no, OUTPUT_DIRECTORY,
+                                cache, cached_hash, results[index][0]): index
+                for index, file_path, file_no, cached_hash, _ in
+                sorted(rtf_files, key=lambda rtf_file: rtf_file[4], reverse=True)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                status, remarks, entry, metrics = future.result()
+                results[index] = (results[index][0], status, remarks,
+                                  summarize_metrics(metrics) if metrics else "")
+                if entry is not None:
+                    new_manifest[results[index][0]] = entry
+                if metrics:
+                    file_metrics[results[index][0]] = metrics
+    else:
+        for index, file_path, file_no, cached_hash, _ in rtf_files:
+            status, remarks, entry, metrics = process_file(file_path, file_no, OUTPUT_DIRECTORY,
+                                                           cache, cached_hash, results[index][0])
+            results[index] = (results[index][0], status, remarks,
+                              summarize_metrics(metrics) if metrics else "")
+            if entry is not None:
+                new_manifest[results[index][0]] = entry
+            if metrics:
+                file_metrics[results[index][0]] = metrics
+
+    if cache:
+        save_manifest(OUTPUT_DIRECTORY, new_manifest)
+    if METRICS:
+        metrics_file = write_metrics(OUTPUT_DIRECTORY, results, file_metrics,
+                                     time.perf_counter() - run_start, workers)
+        debug_print(f"Metrics written to {metrics_file}")
+    if table:
+        for file, status, remarks, summary in results:
+            color = 'red' if status == "Failed" else 'green'
+            values = (file, status, remarks, summary) if METRICS else (file, status, remarks)
+            table.insert("", "end", values=values, tags=(color,))
+    return results
+
+# Functions to watch a folder for new and changed RTF files
+
+def open_inotify(folder):
+    '''
+    This function asks the Linux kernel to report the files written or moved into a folder
+    It returns the inotify file descriptor, or None where inotify is not available,
+    in which case the folder is polled
+    '''
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if inotify_fd < 0:
+        return None
+    if libc.inotify_add_watch(inotify_fd, os.fsencode(folder), INOTIFY_EVENTS) < 0:
+        os.close(inotify_fd)
+        return None
+    return inotify_fd
+
+def read_inotify(inotify_fd, timeout):
+    '''
+    This function waits up to 'timeout' seconds for inotify events
+    It returns the names of the files that the events are about
+    '''
+    names = set()
+    if not select.select([inotify_fd], [], [], timeout)[0]:
+        return names
+    try:
+        events = os.read(inotify_fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    position = 0
+    while position < len(events):
+        _, _, _, name_length = struct.unpack_from("iIII", events, position)
+        position += struct.calcsize("iIII")
+        names.add(os.fsdecode(events[position:position + name_length].rstrip(b"\0")))
+        position += name_length
+    return names
+
+def scan_rtf_files(folder):
+    '''
+    This function returns the size and modification time of each RTF file in a folder
+    '''
+    rtf_files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.rtf') and entry.is_file():
+                file_stat = entry.stat()
+                rtf_files[entry.name] = (file_stat.st_size, file_stat.st_mtime_ns)
+    return rtf_files
+
+def write_status(status_file, record):
+    '''
+    This function adds a status record to the status file as one JSON line
+    '''
+    with open(status_file, 'a', encoding = "utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def watch_folder(selected_folder, workers=None, output_directory=None, cache=None):
+    '''
+    This function watches a folder and converts each RTF file that is added or changed
+    The folder is watched with inotify where it is available, and polled every
+    'poll interval' seconds otherwise
+    A file is only converted once its size and modification time have not changed for
+    'settle seconds' seconds, so files that are still being written are left alone
+    The files are converted by a pool of worker processes, as they become ready
+    When each file is done, its result is printed, the manifest is saved,
+    and a status record is added to the 'status file' in the output directory
+    The files already in the folder are converted first, unless they are cached
+    It runs until it is interrupted
+    '''
+    if workers is None:
+        workers = WORKERS
+    if cache is None:
+        cache = CACHE
+    output_directory = output_directory or os.path.join(selected_folder, 'Output')
+    os.makedirs(output_directory, exist_ok=True)
+    status_file = os.path.join(output_directory, STATUS_FILE)
+    manifest = load_manifest(output_directory) if cache else {}
+    inotify_fd = open_inotify(selected_folder)
+    debug_print("Watching with inotify" if inotify_fd is not None else "Watching by polling")
+
+    # Size and modification time of each file when it was last queued or found cached
+    queued = {}
+    # Files waiting to settle, with their size, modification time and the time it last changed
+    pending = {}
+    running = {}
+    file_no = 0
+    now = time.monotonic()
+    for file, file_state in scan_rtf_files(selected_folder).items():
+        cached, _ = check_cache(os.path.join(selected_folder, file), manifest.get(file),
+                                output_directory, file)
+        if cached:
+            queued[file] = file_state
+        else:
+            pending[file] = file_state + (now,)
 
-        table.insert("", "end", values=(file, status, remarks), tags=(color,))
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers), initializer=init_worker,
+                                 initargs=(CONFIG_PATH, CONFIG_OVERRIDES,
+                                           LOG_QUEUE)) as executor:
+            last_scan = 0.0
+            while True:
+                # Find the files that are new or changed since they were last queued
+                if inotify_fd is not None:
+                    changed = read_inotify(inotify_fd, POLL_INTERVAL)
+                    changed = {file for file in changed if file.endswith('.rtf')}
+                elif time.monotonic() - last_scan >= POLL_INTERVAL:
+                    last_scan = time.monotonic()
+                    rtf_files = scan_rtf_files(selected_folder)
+                    changed = {file for file, file_state in rtf_files.items()
+                               if queued.get(file) != file_state}
+                else:
+                    time.sleep(min(POLL_INTERVAL, 0.2))
+                    changed = set()
+
+                now = time.monotonic()
+                for file in changed | set(pending):
+                    try:
+                        file_stat = os.stat(os.path.join(selected_folder, file))
+                    except FileNotFoundError:
+                        pending.pop(file, None)
+                        continue
+                    file_state = (file_stat.st_size, file_stat.st_mtime_ns)
+                    if file not in pending:
+                        if queued.get(file) != file_state:
+                            pending[file] = file_state + (now,)
+                    elif pending[file][:2] != file_state:
+                        pending[file] = file_state + (now,)
+                    elif now - pending[file][2] >= SETTLE_TIME and file not in running.values():
+                        # The file has settled and is not being converted already
+                        del pending[file]
+                        queued[file] = file_state
+                        file_no += 1
+                        # The content hash is only compared when the output of the file
+                        # is still there and was written with the same config
+                        _, cached_hash = (check_cache(os.path.join(selected_folder, file),
+                                                      manifest.get(file), output_directory,
+                                                      file, file_stat)
+                                          if cache else (False, None))
+                        future = executor.submit(process_file,
+                                                 os.path.join(selected_folder, file), file_no,
+                                                 output_directory, cache, cached_hash)
+                        running[future] = file
+                        debug_print(f"Queued {file}")
+
+                # Report the files that are done
+                for future in [future for future in running if future.done()]:
+                    file = running.pop(future)
+                    try:
+                        status, remarks, entry, _ = future.result()
+                    except Exception as e:
+                        status, remarks, entry = "Failed", str(e), None
+                    if entry is not None:
+                        manifest[file] = entry
+                    elif status == "Failed":
+                        manifest.pop(file, None)
+                    if cache:
+                        save_manifest(output_directory, manifest)
+                    flush_log_files()
+                    write_status(status_file, {
+                        "time": str(datetime.now()), "file": file, "status": status,
+                        "remarks": remarks,
+                        "output": get_output_file(file, output_directory)
+                        if status != "Failed" else None})
+                    print(f"{file}\t{status}\t{remarks}", flush=True)
+    except KeyboardInterrupt:
+        debug_print("Stopped watching")
+    finally:
+        if inotify_fd is not None:
+            os.close(inotify_fd)
+
+# Functions run by the worker processes of the conversion service
+
+def inspect_rtf_bytes(rtf_bytes, name):
+    '''
+    This function checks the schema of an RTF file sent to the conversion service
+    It returns the fonts and the positions of the '\\endnhere' page breaks,
+    or None if the file does not adhere to the schema
+    '''
+    if not CONVERTER.check_rtf(rtf_bytes, RtfDocument(name)):
+        return None
+    fonts = CONVERTER.extract_font_details(read_rtf_prelude(rtf_bytes))
+    page_breaks = []
+    page_start = rtf_bytes.find(PAGE_BREAK)
+    while page_start != -1:
+        page_breaks.append(page_start)
+        page_start = rtf_bytes.find(PAGE_BREAK, page_start + len(PAGE_BREAK))
+    return fonts, page_breaks
+
+def convert_page_batch(name, numpages, first_page_no, page_batch, output_format):
+    '''
+    This function extracts a batch of consecutive pages, given as bytes,
+    and returns their JSON output in the given format
+    '''
+    document = RtfDocument(name, numpages=numpages, templates={}, schemas={})
+    output = []
+    for page_no, page_bytes in enumerate(page_batch, first_page_no):
+        document.page = page_no
+        page_details = CONVERTER.extract_page_content(clean_rtf_content(page_bytes), document)
+        output.append(format_output_page(page_details, page_no - 1, output_format))
+    return "".join(output)
+
+# Local HTTP service converting the RTF files posted to it
+
+class ConversionService:
+    '''
+    This class runs a local HTTP service that converts RTF files to JSON
+    - 'POST /convert' converts the RTF file sent as the request body, and streams back its
+      JSON output in the 'format' of the config file, or in '?format=pretty|compact|ndjson'
+      The output is always written as JSON page by page, whatever the 'layout' and 'sink'
+      of the config file
+      The 'X-File-Name' header names the file in the log records
+    - 'GET /health' returns the state of the service
+    - 'GET /metrics' returns the request counters of the service
+    The files are converted by a pool of 'workers' processes, one file per worker at a time,
+    with at most two batches of pages of each file sent to the pool at once
+    Up to 'queue limit' requests wait for a worker, the requests after them are
+    turned away with '503 Service Unavailable' until a worker is free
+    A request taking longer than 'request timeout' seconds is stopped
+    asyncio, http and urllib are only imported by the functions of the service,
+    so they do not slow down the start of the batch and User Interface runs
+    '''
+
+    def __init__(self, host=None, port=None, workers=None, queue_limit=None, timeout=None,
+                 max_size=None):
+        '''The options that are not given are taken from the SERVICE section of the config'''
+        self.host = host or SERVICE_HOST
+        self.port = SERVICE_PORT if port is None else port
+        self.workers = workers or SERVICE_WORKERS
+        self.queue_limit = SERVICE_QUEUE_LIMIT if queue_limit is None else queue_limit
+        self.timeout = timeout or SERVICE_TIMEOUT
+        self.max_size = max_size or SERVICE_MAX_SIZE
+        self.executor = None
+        self.worker_slots = None
+        self.started = time.time()
+        self.admitted = 0
+        self.running = 0
+        self.counters = dict.fromkeys(("requests", "completed", "failed", "rejected",
+                                       "timed out", "pages", "bytes"), 0)
+
+    async def serve(self, ready=None):
+        '''
+        This function runs the service until it is cancelled or interrupted
+        'ready' is called with the address of the service once it is listening
+        '''
+        import asyncio
+        self.worker_slots = asyncio.Semaphore(self.workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                            initargs=(CONFIG_PATH, CONFIG_OVERRIDES, LOG_QUEUE))
+        try:
+            server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            async with server:
+                address = server.sockets[0].getsockname()
+                if ready is not None:
+                    ready(address)
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            flush_log_files()
+
+    def state(self):
+        '''This function returns the state of the service'''
+        return {"status": "ok", "uptime": round(time.time() - self.started, 3),
+                "workers": self.workers, "running": self.running,
+                "queued": self.admitted - self.running, "queue limit": self.queue_limit}
+
+    async def handle_connection(self, reader, writer):
+        '''This function answers a single request, then closes the connection'''
+        import asyncio
+        try:
+            request = await asyncio.wait_for(self.read_request_head(reader), self.timeout)
+            if request is None:
+                await self.send_json(writer, 400, {"error": "Malformed request"})
+                return
+            method, path, query, headers = request
+            if path == "/health" and method == "GET":
+                await self.send_json(writer, 200, self.state())
+            elif path == "/metrics" and method == "GET":
+                await self.send_json(writer, 200, dict(self.state(), **self.counters))
+            elif path == "/convert" and method == "POST":
+                await self.handle_convert(reader, writer, query, headers)
+            elif path in ("/health", "/metrics", "/convert"):
+                await self.send_json(writer, 405, {"error": f"{method} not allowed"})
+            else:
+                await self.send_json(writer, 404, {"error": f"{path} not found"})
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            writer.transport.abort()
+        finally:
+            writer.close()
+
+    async def read_request_head(self, reader):
+        '''
+        This function reads the request line and headers of an HTTP request
+        It returns the method, path, query options and headers, or None if they are malformed
+        '''
+        import urllib.parse
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3 or not request_line[2].startswith("HTTP/"):
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, separator, value = line.decode("latin-1").partition(":")
+            if not separator:
+                return None
+            headers[name.strip().lower()] = value.strip()
+        url = urllib.parse.urlsplit(request_line[1])
+        query = dict(urllib.parse.parse_qsl(url.query))
+        return request_line[0].upper(), url.path, query, headers
+
+    async def handle_convert(self, reader, writer, query, headers):
+        '''
+        This function converts the RTF file sent in the body of a 'POST /convert' request
+        The request is checked and admitted before its body is read
+        '''
+        import asyncio
+        self.counters["requests"] += 1
+        if not headers.get("content-length", "").isdigit():
+            self.counters["failed"] += 1
+            await self.send_json(writer, 411, {"error": "Content-Length is required"})
+            return
+        content_length = int(headers["content-length"])
+        if content_length > self.max_size:
+            self.counters["failed"] += 1
+            await self.send_json(writer, 413, {"error": "Request is larger than "
+                                               f"{self.max_size // (1024 * 1024)} MB"})
+            return
+        output_format = query.get("format", OUTPUT_FORMAT)
+        if output_format not in ("pretty", "compact", "ndjson"):
+            self.counters["failed"] += 1
+            await self.send_json(writer, 400, {"error": f"Unknown format {output_format}"})
+            await self.discard_body(reader, content_length)
+            return
+        if self.admitted >= self.workers + self.queue_limit:
+            self.counters["rejected"] += 1
+            await self.send_json(writer, 503, {"error": "Too many requests waiting"},
+                                 [("Retry-After", "1")])
+            await self.discard_body(reader, content_length)
+            return
+
+        name = headers.get("x-file-name") or f"request-{self.counters['requests']}"
+        self.admitted += 1
+        response = {"started": False}
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                rtf_bytes = await reader.readexactly(content_length)
+                async with self.worker_slots:
+                    self.running += 1
+                    try:
+                        await self.convert(writer, rtf_bytes, name, output_format, response)
+                    finally:
+                        self.running -= 1
+        except asyncio.TimeoutError:
+            self.counters["timed out"] += 1
+            log_exception(f"{name} was not converted within {self.timeout} seconds\n",
+                          stage="serve", file=name,
+                          duration=round(time.perf_counter() - start, 6))
+            if response["started"]:
+                writer.transport.abort()
+            else:
+                await self.send_json(writer, 504, {"error": "Request timed out"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            raise
+        except Exception as e:
+            # An unexpected error of a worker process fails this request only
+            self.counters["failed"] += 1
+            log_exception(f"{name} cannot be converted due to {e!r}\n", stage="serve",
+                          file=name, duration=round(time.perf_counter() - start, 6))
+            if response["started"]:
+                writer.transport.abort()
+            else:
+                await self.send_json(writer, 500, {"error": "Conversion failed"})
+        finally:
+            self.admitted -= 1
+            flush_log_files()
+
+    async def convert(self, writer, rtf_bytes, name, output_format, response):
+        '''
+        This function converts an RTF file in the worker processes and streams its JSON output
+        The response is started once the first batch of pages is extracted, so a file that
+        cannot be converted is still answered with an error status
+        A file that fails after that has its response cut short
+        '''
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        self.counters["bytes"] += len(rtf_bytes)
+        try:
+            inspected = await loop.run_in_executor(self.executor, inspect_rtf_bytes,
+                                                   rtf_bytes, name)
+        except ValueError:
+            inspected = None
+        if inspected is None:
+            self.counters["failed"] += 1
+            log_exception(f"RTF File {name} does not conform to schema, cannot be converted\n",
+                          stage="check_rtf", file=name)
+            await self.send_json(writer, 400, {"error": "RTF file does not conform to schema"})
+            return
+        fonts, page_breaks = inspected
+        numpages = len(page_breaks)
+        page_breaks.append(len(rtf_bytes))
+        content_type = "application/x-ndjson" if output_format == "ndjson" else "application/json"
+
+        def start_response():
+            response["started"] = True
+            writer.write(self.response_head(200, [("Content-Type", content_type),
+                                                  ("Transfer-Encoding", "chunked")]))
+            self.write_chunk(writer, format_output_start(fonts, output_format))
+
+        futures = deque()
+        next_page = 1
+        try:
+            while next_page <= numpages or futures:
+                while next_page <= numpages and len(futures) < 2:
+                    last_page = min(next_page + PAGE_BATCH - 1, numpages)
+                    page_batch = [rtf_bytes[page_breaks[i - 1]:page_breaks[i]]
+                                  for i in range(next_page, last_page + 1)]
+                    futures.append(loop.run_in_executor(
+                        self.executor, convert_page_batch, name, numpages, next_page,
+                        page_batch, output_format))
+                    next_page = last_page + 1
+                try:
+                    output = await futures.popleft()
+                except (AttributeError, IndexError):
+                    self.counters["failed"] += 1
+                    log_exception(f"{name} cannot be converted due to \n", stage="convert_rtf",
+                                  file=name, duration=round(time.perf_counter() - start, 6))
+                    if response["started"]:
+                        writer.transport.abort()
+                    else:
+                        await self.send_json(writer, 422, {"error": "Not in Scope"})
+                    return
+                if not response["started"]:
+                    start_response()
+                self.write_chunk(writer, output)
+                # The next batch is only sent to the pool once the client has read this one
+                await writer.drain()
+            if not response["started"]:
+                start_response()
+            self.write_chunk(writer, format_output_end(numpages, output_format))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # Batches that are not started are dropped if the request fails or times out
+            for future in futures:
+                future.cancel()
+        self.counters["completed"] += 1
+        self.counters["pages"] += numpages
+        log_success(f"Data successfully sent for {name}\n", stage="serve", file=name,
+                    duration=round(time.perf_counter() - start, 6))
+
+    async def discard_body(self, reader, content_length):
+        '''
+        This function reads and drops the body of a request that is turned away,
+        so the client reads the response instead of having its connection reset
+        The body is never held in memory
+        '''
+        import asyncio
+        async with asyncio.timeout(self.timeout):
+            while content_length > 0:
+                data = await reader.read(min(content_length, 64 * 1024))
+                if not data:
+                    break
+                content_length -= len(data)
+
+    @staticmethod
+    def response_head(status, headers):
+        '''This function returns the status line and headers of a response'''
+        from http import HTTPStatus
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    @staticmethod
+    def write_chunk(writer, text):
+        '''This function writes text as a chunk of a chunked response'''
+        if text:
+            data = text.encode("utf-8")
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+    async def send_json(self, writer, status, body, headers=()):
+        '''This function sends a complete JSON response'''
+        content = json.dumps(body, indent=4).encode("utf-8")
+        writer.write(self.response_head(status, [("Content-Type", "application/json"),
+                                                 ("Content-Length", str(len(content)))]
+                                        + list(headers)) + content)
+        await writer.drain()
 
 def on_continue():
     '''
     This function serves as a placeholder for the functionality of the 'continue' button
     '''
+    from tkinter import messagebox
     messagebox.showinfo("Info", "Continue button clicked!")
 
 def on_delete():
@@ -480,7 +3184,10 @@ def on_delete():
 def user_interface():
     '''
     This function is used to set up the User Interface
+    tkinter is only imported here, so the converter can run on machines without a display
     '''
+    import tkinter as tk
+    from tkinter import ttk
     app = tk.Tk()
     app.title("RTF to JSON Converter")
     app.geometry("800x600")
@@ -509,10 +3216,14 @@ def user_interface():
 
     global table
     columns = ("File Name", "Status", "Remarks")
+    if METRICS:
+        columns += ("Metrics",)
     table = ttk.Treeview(app, columns=columns, show="headings")
     table.heading("File Name", text="File Name")
     table.heading("Status", text="Status")
     table.heading("Remarks", text="Remarks")
+    if METRICS:
+        table.heading("Metrics", text="Metrics")
     table.place(relx=0.5, rely=0.57, anchor=tk.CENTER, relwidth=0.8, relheight=0.55)
 
     table.tag_configure('green', background='lightgreen')
@@ -534,9 +3245,133 @@ def user_interface():
     app.mainloop()
     debug_print("UI loaded")
 
-# Main function to call the user_interface() function
+def main(argv=None):
+    '''
+    This function is the command line entry point of the converter
+    It converts the RTF files of a folder without the User Interface
+    The results are printed one file per line as 'file, status, remarks' separated by tabs,
+    followed by the metrics summary when the metrics are switched on
+    With '--watch', the folder is watched and the files are converted as they arrive
+    With '--serve', the files posted to a local HTTP service are converted instead
+    With '--query', the index of the output folder is searched instead, and the file and page
+    of each match are printed
+    It returns 1 if any RTF file could not be converted, else 0
+    '''
+    parser = argparse.ArgumentParser(
+        description="Convert the RTF files of a folder to JSON without the User Interface")
+    parser.add_argument("input_dir", nargs="?",
+                        help="folder containing the RTF files, which are also looked for "
+                             "in its subfolders")
+    parser.add_argument("-o", "--output-dir",
+                        help="folder for the JSON files (default: INPUT_DIR/Output)")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="number of worker processes (default: from the config file)")
+    parser.add_argument("-c", "--config", default="config.ini",
+                        help="path of the config file (default: config.ini)")
+    parser.add_argument("--format", choices=("pretty", "compact", "ndjson"),
+                        help="format of the output files (default: from the config file)")
+    parser.add_argument("--sink", choices=("json", "sqlite"),
+                        help="write one JSON file per RTF file, or write every RTF file to "
+                             "one SQLite database in the output folder "
+                             "(default: from the config file)")
+    parser.add_argument("--layout", choices=("pages", "tables"),
+                        help="write every page, or merge the consecutive pages of the same "
+                             "table into one table (default: from the config file)")
+    parser.add_argument("--tables", choices=("none", "columnar", "csv", "sqlite"),
+                        help="also write the subject table data in this format "
+                             "(default: from the config file)")
+    parser.add_argument("--column-types", action="store_true",
+                        help="convert the values of each table column to the type found for "
+                             "the column, and write the column types of each page")
+    parser.add_argument("--index", action="store_true",
+                        help="add the words of the titles, headers and footnotes of each "
+                             "file to the index of the output folder")
+    parser.add_argument("--query",
+                        help="print the file and page of each page with all these words "
+                             "in the index of the output folder, instead of converting")
+    parser.add_argument("--field", choices=("title", "header", "footnotes"),
+                        help="only search this field of the index with '--query'")
+    parser.add_argument("--page-workers", type=int,
+                        help="number of worker processes extracting the pages of a single file "
+                             "(default: from the config file)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="convert every file, even if it is unchanged since the last run")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep watching the folder and convert each RTF file "
+                             "as it is added or changed, until interrupted")
+    parser.add_argument("--serve", action="store_true",
+                        help="run a local HTTP service converting the RTF files posted to "
+                             "/convert, until interrupted")
+    parser.add_argument("--host", help="address of the service (default: from the config file)")
+    parser.add_argument("--port", type=int,
+                        help="port of the service (default: from the config file)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record the time of each conversion stage and write "
+                             "a metrics file to the output folder")
+    args = parser.parse_args(argv)
+    if args.input_dir is None and not args.serve and not (args.query and args.output_dir):
+        parser.error("the input_dir argument is required")
+
+    overrides = {}
+    if args.format:
+        overrides.setdefault('OUTPUT', {})['format'] = args.format
+    if args.sink:
+        overrides.setdefault('OUTPUT', {})['sink'] = args.sink
+    if args.layout:
+        overrides.setdefault('OUTPUT', {})['layout'] = args.layout
+    if args.tables:
+        overrides.setdefault('OUTPUT', {})['tables'] = args.tables
+    if args.column_types:
+        overrides.setdefault('OUTPUT', {})['column types'] = "yes"
+    if args.index:
+        overrides.setdefault('OUTPUT', {})['index'] = "yes"
+    if args.metrics:
+        overrides.setdefault('PROCESSING', {})['metrics'] = "yes"
+    if args.page_workers:
+        overrides.setdefault('PROCESSING', {})['page workers'] = str(args.page_workers)
+    load_config(args.config, overrides)
+    if args.query is not None:
+        matches = query_index(args.output_dir or os.path.join(args.input_dir, 'Output'),
+                              args.query, args.field)
+        for file, page_no in matches:
+            print(f"{file}\t{page_no}")
+        return int(not matches)
+    open_log_files()
+    if args.serve:
+        import asyncio
+        # A service manager stops the service with SIGTERM, which is handled as Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        service = ConversionService(args.host, args.port, args.workers)
+        try:
+            asyncio.run(service.serve(
+                lambda address: print(f"Serving on http://{address[0]}:{address[1]}",
+                                      flush=True)))
+        except KeyboardInterrupt:
+            debug_print("Stopped serving")
+        return 0
+    if args.watch:
+        # A service manager stops the watcher with SIGTERM, which is handled as Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        watch_folder(args.input_dir, args.workers, args.output_dir,
+                     False if args.no_cache else None)
+        return 0
+    results = process_files(args.input_dir, args.workers, args.output_dir,
+                            False if args.no_cache else None)
+    flush_log_files()
+    for file, status, remarks, summary in results:
+        print(f"{file}\t{status}\t{remarks}\t{summary}" if METRICS
+              else f"{file}\t{status}\t{remarks}")
+    return int(any(status == "Failed" and file.endswith('.rtf')
+                   for file, status, _, _ in results))
+
+# Main function to call the main() or user_interface() function
 if __name__ == "__main__" :
+    if len(sys.argv) > 1:
+        # A folder given on the command line is converted without the User Interface
+        sys.exit(main())
     try:
+        load_config()
+        open_log_files()
         user_interface()
     except Exception:
         debug_print("UI unsuccessful")
@@ -962,4 +3797,23 @@ def test_convert_rtf():
         # Assert that error_files have no valid font details
         for file in invalid_rtf:
             # Ensure error files are truly malformed or incorrect
-            assert not convert_rtf(open(file).read()), f"File {file} should have an empty rtf content details due to errors."
\ No newline at end of file
+            assert not convert_rtf(open(file).read()), f"File {file} should have an empty rtf content details due to errors."
+
+#test function to find the table cells of a row
+
+"""
+This test function is to check that the table cells are found by 'BraceIndex.cells',
+with the escaped braces in the text of the row not taken as groups
+"""
+def test_brace_index_cells():
+    # Test case 1: Cells of a row
+    assert list(BraceIndex(r'\trowd {A\cell}{B\cell}{\row}').cells(0)) == ['A', 'B']
+
+    # Test case 2: Escaped brace before the cells
+    assert list(BraceIndex(r'\trowd x \{ y {T1\cell}{\row}').cells(0)) == ['T1']
+
+    # Test case 3: Escaped braces inside a cell
+    assert list(BraceIndex(r'{a \{b\} c\cell}{\row}').cells(0)) == [r'a \{b\} c']
+
+    # Test case 4: Escaped backslash before a brace that opens a cell
+    assert list(BraceIndex(r'x\\{T2\cell}').cells(0)) == ['T2']
\ No newline at end of file
@@ -10,7 +10,6 @@ config_object['RTF TAGS'] = {
     "cell end": "\\cell}"
 }
 config_object['RE EXPRESSIONS'] = {
-    "font table": r"{\\fonttbl(.*)}",
     "font pattern": r'{\\f(\d+)\\.*? ([^;]+?);}',
     "header": r"{(?!\\)(.+)\\cell}",
     "headerstyle": r"(?<=q)[lrc]\\"
@@ -21,6 +20,45 @@ config_object['HEADER ALIGNMENT'] = {
     "c": "centre",
     "r": "right"
 }
+config_object['PROCESSING'] = {
+    "workers": "1",
+    "stream size mb": "64",
+    "cache": "yes",
+    "metrics": "no",
+    "page workers": "1",
+    "page batch": "50",
+    "compact rows": "no"
+}
+config_object['OUTPUT'] = {
+    "format": "pretty",
+    "layout": "pages",
+    "tables": "none",
+    "column types": "no",
+    "sink": "json",
+    "database": "output.sqlite",
+    "index": "no"
+}
+config_object['LOG FILES'] = {
+    "exceptions": "Log File Exceptions.txt",
+    "success": "Log File Success.txt",
+    "format": "text",
+    "max size mb": "10",
+    "backup count": "5",
+    "batch size": "100"
+}
+config_object['WATCH'] = {
+    "poll interval": "1",
+    "settle seconds": "2",
+    "status file": "status.ndjson"
+}
+config_object['SERVICE'] = {
+    "host": "127.0.0.1",
+    "port": "8765",
+    "workers": "1",
+    "queue limit": "8",
+    "request timeout": "300",
+    "max request mb": "256"
+}
 
 with open('config.ini', 'w') as conf:
     config_object.write(conf)
\ No newline at end of file